@@ -1,3 +1,12 @@
 """sortai – LLM-powered directory organizer using Google Gemini."""
 
 __version__ = "0.1.3"
+
+
+def __getattr__(name: str):
+    # Loaded on first use so `import sortai` (and --version) stays fast.
+    if name in ("Organizer", "ApplyResult", "MoveIssue", "suggest_moves"):
+        from sortai import api
+
+        return getattr(api, name)
+    raise AttributeError(f"module 'sortai' has no attribute {name!r}")
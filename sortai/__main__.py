@@ -0,0 +1,18 @@
+"""Console entry point. Answers --version without importing click or the rest of sortai."""
+
+import sys
+
+
+def main() -> None:
+    if sys.argv[1:] == ["--version"]:
+        from sortai import __version__
+
+        print(f"sortai {__version__}")
+        return
+    from sortai.cli import main as cli_main
+
+    cli_main()
+
+
+if __name__ == "__main__":
+    main()
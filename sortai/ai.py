@@ -1,132 +1,430 @@
-"""Gemini API client: build prompt from file list, call model, parse JSON moves."""
+"""Model client: build prompt from file list, call model (Gemini by default), parse JSON moves."""
 
 import json
-import os
+import random
 import re
-from typing import Any
+import time
+from typing import Any, Callable, Iterator, Optional
 
-GEMINI_API_KEY_URL = "https://aistudio.google.com/app/apikey"
+from sortai.backends import GEMINI_API_KEY_URL, Backend, GeminiBackend, MissingApiKeyError
+from sortai.cache import MovesCache
+from sortai.profiling import get_profiler
+from sortai.tree import safe_target
+
+# Estimated prompt tokens per request; larger file lists are split into batches.
+BATCH_TOKEN_BUDGET = 30_000
+
+# Preview characters kept per file in compact prompts.
+COMPACT_PREVIEW_LENGTH = 200
+
+# Batches sent at the same time after the first one.
+DEFAULT_CONCURRENCY = 4
+
+# Retries on rate-limit (429) responses, with exponential backoff in seconds.
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
 
 
 def list_available_models() -> list[str]:
     """List available Gemini models for the current API key."""
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key or not api_key.strip():
-        return []
-    
     try:
-        from google import genai
-        client = genai.Client(api_key=api_key.strip())
-        models = client.models.list()
-        model_names = []
-        for m in models:
-            if hasattr(m, "name"):
-                name = m.name.split("/")[-1] if "/" in m.name else m.name
-                model_names.append(name)
-        return model_names
-    except Exception:
+        return GeminiBackend().list_models()
+    except MissingApiKeyError:
         return []
 
 
-class MissingApiKeyError(Exception):
-    """Raised when GEMINI_API_KEY is not set."""
-
-    def __init__(self) -> None:
-        super().__init__(
-            "GEMINI_API_KEY is not set. Get an API key at " + GEMINI_API_KEY_URL
-        )
-
-
 def get_moves(
     file_list: list[dict],
     depth: int,
     model_name: str = "gemini-2.5-flash",
+    cache: Optional[MovesCache] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    batch_tokens: int = BATCH_TOKEN_BUDGET,
+    folders: Optional[list[str]] = None,
+    backend: Optional[Backend] = None,
+    compact: bool = False,
 ) -> list[tuple[str, str]]:
     """
-    Call Gemini to suggest folder structure. Returns list of (relative_path, target_folder).
+    Call the model (Gemini unless another backend is given) to suggest folder structure.
+    Returns list of (relative_path, target_folder).
     target_folder may be "." for root or e.g. "documents" or "documents/work" when depth > 1.
-    Raises MissingApiKeyError if GEMINI_API_KEY is not set.
+    File lists larger than batch_tokens (estimated) are split into batches: the first batch
+    is sent alone, and its folders are suggested to the remaining batches, which are sent
+    with up to `concurrency` requests in flight. `folders` are existing folder names
+    (e.g. from local rules) the model should prefer. With compact, files are listed grouped by
+    folder and referred to by numeric id, with whitespace-normalized, shorter previews.
+    If cache is given, a previous result for the same prompt, model and depth is reused.
+    Raises MissingApiKeyError if no backend is given and GEMINI_API_KEY is not set.
     """
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key or not api_key.strip():
-        raise MissingApiKeyError()
+    if backend is None:
+        backend = GeminiBackend(model_name)
 
-    try:
-        from google import genai
-    except ImportError:
-        raise ImportError(
-            "google-genai package not installed. Run: pip install google-genai"
-        )
-    
-    client = genai.Client(api_key=api_key.strip())
-    prompt = _build_prompt(file_list, depth)
-    
-    # Try common model name variations
-    model_variations = [
-        model_name,
-        f"models/{model_name}",
-        f"publishers/google/models/{model_name}",
-    ]
-    
-    last_error = None
-    for model_variant in model_variations:
+    with get_profiler().stage("get_moves", files=len(file_list)):
+        return _get_moves(file_list, depth, backend, cache, concurrency, batch_tokens, folders, compact)
+
+
+def _get_moves(
+    file_list: list[dict],
+    depth: int,
+    backend: Backend,
+    cache: Optional[MovesCache],
+    concurrency: int,
+    batch_tokens: int,
+    folders: Optional[list[str]],
+    compact: bool,
+) -> list[tuple[str, str]]:
+    profiler = get_profiler()
+    batches = _batch_files(file_list, depth, batch_tokens, compact)
+    cache_key = None
+    if cache is not None:
+        cache_key = MovesCache.key(_build_prompt(file_list, depth, folders, compact), backend.cache_id, depth)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            profiler.count("moves_cache_hits")
+            return cached
+
+    def run_batch(batch: list[dict], folders: Optional[list[str]] = None) -> tuple[list[tuple[str, str]], bool]:
+        prompt = _build_prompt(batch, depth, folders, compact)
+        tokens = _estimate_tokens(prompt)
+        with profiler.stage("model_request", files=len(batch), prompt_chars=len(prompt), prompt_tokens_est=tokens):
+            text = _with_backoff(lambda: backend.generate(prompt))
+        profiler.count("model_requests")
+        profiler.count("prompt_chars", len(prompt))
+        profiler.count("prompt_tokens_est", tokens)
+        profiler.count("response_chars", len(text))
+        with profiler.stage("parse_moves"):
+            return _parse_response(text, batch, depth)
+
+    moves, complete = run_batch(batches[0], folders) if batches else ([], True)
+    if len(batches) > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        folders = sorted(set(folders or []) | {target for _, target in moves if target != "."})
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            for batch_moves, batch_complete in pool.map(lambda b: run_batch(b, folders), batches[1:]):
+                moves.extend(batch_moves)
+                complete = complete and batch_complete
+        moves = _unify_folders(moves)
+
+    # Moves recovered from a malformed or cut-off response are used once, but not cached.
+    if cache is not None and moves and complete:
+        cache.put(cache_key, moves)
+    return moves
+
+
+def iter_moves(
+    file_list: list[dict],
+    depth: int,
+    model_name: str = "gemini-2.5-flash",
+    cache: Optional[MovesCache] = None,
+    batch_tokens: int = BATCH_TOKEN_BUDGET,
+    folders: Optional[list[str]] = None,
+    backend: Optional[Backend] = None,
+    compact: bool = False,
+) -> Iterator[tuple[str, str]]:
+    """
+    Like get_moves, but streams the model response and yields each (relative_path, target_folder)
+    as soon as its JSON entry is complete. Batches are sent one after another; if the response is
+    cut off, the moves received so far have already been yielded, and nothing is cached.
+    """
+    if backend is None:
+        backend = GeminiBackend(model_name)
+    profiler = get_profiler()
+    cache_key = None
+    if cache is not None:
+        cache_key = MovesCache.key(_build_prompt(file_list, depth, folders, compact), backend.cache_id, depth)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            profiler.count("moves_cache_hits")
+            yield from cached
+            return
+
+    moves: list[tuple[str, str]] = []
+    complete = True
+    folders = list(folders or [])
+    for batch in _batch_files(file_list, depth, batch_tokens, compact):
+        prompt = _build_prompt(batch, depth, folders, compact)
+        profiler.count("model_requests")
+        profiler.count("prompt_chars", len(prompt))
+        profiler.count("prompt_tokens_est", _estimate_tokens(prompt))
+        parser = MoveStreamParser(batch, depth)
+        seen: set[str] = set()
+        with profiler.stage("model_request", files=len(batch), prompt_chars=len(prompt), streamed=True):
+            for chunk in _stream_with_backoff(backend, prompt):
+                profiler.count("response_chars", len(chunk))
+                for move in parser.feed(chunk):
+                    if move[0] in seen:
+                        continue
+                    seen.add(move[0])
+                    moves.append(move)
+                    yield move
+        complete = complete and parser.complete
+        # Later batches are steered towards the folders already in use.
+        folders = sorted(set(folders) | {target for _, target in moves if target != "."})
+
+    if cache is not None and moves and complete:
+        cache.put(cache_key, moves)
+
+
+def _stream_with_backoff(backend: Backend, prompt: str) -> Iterator[str]:
+    """backend.stream(prompt), retrying rate-limit errors that arrive before any text was received."""
+    for attempt in range(MAX_RETRIES + 1):
+        received = False
         try:
-            response = client.models.generate_content(
-                model=model_variant,
-                contents=prompt,
-            )
-            text = (response.text or "").strip()
-            return _parse_moves(text, file_list)
+            for chunk in backend.stream(prompt):
+                received = True
+                yield chunk
+            return
         except Exception as e:
-            last_error = e
-            if "404" not in str(e) and "not found" not in str(e).lower():
-                # Not a 404, re-raise immediately
+            if received or attempt == MAX_RETRIES or not _is_rate_limited(e):
                 raise
-    
-    # If all variations failed, try to list available models
-    if "404" in str(last_error) or "not found" in str(last_error).lower():
-        available = list_available_models()
-        if available:
-            raise ValueError(
-                f"Model '{model_name}' not found. Available models: {', '.join(available[:10])}"
-            )
+            get_profiler().count("rate_limit_retries")
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+            time.sleep(delay * (0.5 + random.random() / 2))
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """True if error looks like a 429 / quota response from the API."""
+    message = str(error).lower()
+    return "429" in message or "resource_exhausted" in message or "rate limit" in message
+
+
+def _with_backoff(call: Callable[[], Any]) -> Any:
+    """Run call, retrying with exponential backoff and jitter while the API is rate limiting."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == MAX_RETRIES or not _is_rate_limited(e):
+                raise
+            get_profiler().count("rate_limit_retries")
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+            time.sleep(delay * (0.5 + random.random() / 2))
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _file_lines(item: dict) -> list[str]:
+    """Prompt lines describing one file."""
+    path = item.get("path", "")
+    preview = item.get("content_preview")
+    if preview:
+        return [f"- {path}", f"  content_preview: {preview!r}"]
+    return [f"- {path} (filename/extension only)"]
+
+
+def _compact_line(index: int, item: dict) -> str:
+    """Compact prompt line for one file: id, filename, and a whitespace-normalized preview."""
+    name = item.get("path", "").rsplit("/", 1)[-1]
+    preview = item.get("content_preview")
+    if not preview:
+        return f"{index}: {name}"
+    preview = " ".join(preview.split())[:COMPACT_PREVIEW_LENGTH]
+    return f"{index}: {name} | {preview}"
+
+
+def _compact_file_lines(file_list: list[dict]) -> list[str]:
+    """Files grouped under one "[folder]" header per directory; ids are indexes into file_list."""
+    groups: dict[str, list[str]] = {}
+    for index, item in enumerate(file_list):
+        folder = item.get("path", "").rpartition("/")[0] or "."
+        groups.setdefault(folder, []).append(_compact_line(index, item))
+    lines = []
+    for folder, entries in groups.items():
+        lines.append(f"[{folder}]")
+        lines.extend(entries)
+    return lines
+
+
+def _batch_files(file_list: list[dict], depth: int, budget: int, compact: bool = False) -> list[list[dict]]:
+    """Split file_list into consecutive batches whose prompts stay within roughly `budget` tokens."""
+    overhead = _estimate_tokens(_build_prompt([], depth, compact=compact))
+    batches: list[list[dict]] = []
+    current: list[dict] = []
+    used = overhead
+    for item in file_list:
+        if compact:
+            # Ids grow with the batch; a folder header is counted for every file to stay on the safe side.
+            cost = _estimate_tokens(_compact_line(len(current), item)) + _estimate_tokens(item.get("path", "")) // 2 + 1
         else:
-            raise ValueError(
-                f"Model '{model_name}' not found. Common models: gemini-1.5-flash, gemini-1.5-pro, gemini-2.5-flash"
-            ) from last_error
-    raise last_error
-    
+            cost = _estimate_tokens("\n".join(_file_lines(item))) + 1
+        if current and used + cost > budget:
+            batches.append(current)
+            current = []
+            used = overhead
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
 
 
-def _build_prompt(file_list: list[dict], depth: int) -> str:
+def _build_prompt(
+    file_list: list[dict],
+    depth: int,
+    folders: Optional[list[str]] = None,
+    compact: bool = False,
+) -> str:
     """Build the prompt for Gemini with file list and depth rules."""
     lines = [
         "You are organizing files in a directory. Given the list of files below (with optional content previews), suggest a folder structure.",
         "",
         "Rules:",
-        "- Use only the relative paths exactly as given in the file list.",
+    ]
+    if compact:
+        lines += [
+            "- Files are grouped under [folder] headers ('.' is the root). Each line is 'id: filename', optionally followed by ' | ' and a content preview.",
+            "- Refer to files by their numeric id.",
+        ]
+    else:
+        lines.append("- Use only the relative paths exactly as given in the file list.")
+    lines += [
         f"- Maximum folder depth is {depth}. So target_folder must be at most {depth} path segments (e.g. for depth 1 use a single folder name like 'documents'; for depth 2 you can use 'documents/work').",
         "- Use forward slashes in target_folder (e.g. 'documents/work').",
         "- To leave a file at the root, use target_folder: '.'.",
         "- Do not suggest moving outside the given directory or using absolute paths.",
-        "- Output ONLY a single JSON object, no other text. Format:",
-        '{"moves": [{"path": "filename.txt", "target_folder": "documents"}, ...]}',
+    ]
+    if folders:
+        lines.append(f"- Prefer these existing folders when a file fits one of them: {', '.join(folders)}.")
+    lines.append("- Output ONLY a single JSON object, no other text. Format:")
+    if compact:
+        lines.append('{"moves": [{"id": 0, "target_folder": "documents"}, ...]}')
+    else:
+        lines.append('{"moves": [{"path": "filename.txt", "target_folder": "documents"}, ...]}')
+    lines += [
         "",
         "File list:",
     ]
-    for item in file_list:
-        path = item.get("path", "")
-        preview = item.get("content_preview")
-        if preview:
-            lines.append(f"- {path}")
-            lines.append(f"  content_preview: {preview!r}")
-        else:
-            lines.append(f"- {path} (filename/extension only)")
+    if compact:
+        lines.extend(_compact_file_lines(file_list))
+    else:
+        for item in file_list:
+            lines.extend(_file_lines(item))
     return "\n".join(lines)
 
 
-def _parse_moves(response_text: str, file_list: list[dict]) -> list[tuple[str, str]]:
-    """Extract JSON from response, validate paths against file_list, return list of (path, target_folder)."""
+def _unify_folders(moves: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Map folder names that differ only in case to the first spelling seen, so batches agree."""
+    canonical: dict[str, str] = {}
+    result = []
+    for path, target in moves:
+        target = canonical.setdefault(target.lower(), target)
+        result.append((path, target))
+    return result
+
+
+class MoveStreamParser:
+    """
+    Incremental parser for a {"moves": [...]} response. feed() takes text as it arrives and returns
+    the moves whose JSON objects completed, validated against file_list. Code fences and other
+    text around the JSON are ignored. complete is True once the outer object has closed and no
+    move object was malformed, i.e. nothing was lost to a cut-off or broken response.
+    """
+
+    def __init__(self, file_list: list[dict], depth: Optional[int] = None) -> None:
+        self.file_list = file_list
+        self.depth = depth
+        self.valid_paths = {item["path"] for item in file_list}
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._entry: list[str] = []  # text of the move object being read
+        self._closed = False
+        self._malformed = False
+
+    @property
+    def complete(self) -> bool:
+        return self._closed and not self._malformed and self._depth == 0
+
+    def feed(self, text: str) -> list[tuple[str, str]]:
+        moves = []
+        for ch in text:
+            if self._depth >= 2:
+                self._entry.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = self._depth > 0
+            elif ch == "{":
+                self._depth += 1
+                if self._depth == 2:
+                    self._entry = [ch]
+            elif ch == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._closed = True
+                elif self._depth == 1:
+                    move = self._finish("".join(self._entry))
+                    if move is not None:
+                        moves.append(move)
+        return moves
+
+    def _finish(self, entry_text: str) -> Optional[tuple[str, str]]:
+        try:
+            entry = json.loads(entry_text)
+        except json.JSONDecodeError:
+            self._malformed = True
+            return None
+        return _validate_move(entry, self.file_list, self.valid_paths, self.depth)
+
+
+def _validate_move(
+    entry: Any,
+    file_list: list[dict],
+    valid_paths: set[str],
+    depth: Optional[int] = None,
+) -> Optional[tuple[str, str]]:
+    """
+    (path, target_folder) for one response entry, or None if it does not name a listed file or
+    its target is unsafe (absolute or containing ".."). Targets deeper than depth are cut short.
+    """
+    if not isinstance(entry, dict):
+        return None
+    path = entry.get("path")
+    target = entry.get("target_folder")
+    if path is None and entry.get("id") is not None:
+        try:
+            index = int(entry["id"])
+        except (TypeError, ValueError):
+            return None
+        if 0 <= index < len(file_list):
+            path = file_list[index]["path"]
+    if path is None or target is None:
+        return None
+    path = str(path).strip()
+    if path not in valid_paths:
+        return None
+    target = safe_target(str(target), depth)
+    if target is None:
+        return None
+    return (path, target)
+
+
+def _parse_moves(
+    response_text: str, file_list: list[dict], depth: Optional[int] = None
+) -> list[tuple[str, str]]:
+    """
+    Extract JSON from response, validate paths against file_list, return list of (path, target_folder).
+    Targets are checked as in _validate_move.
+    Entries may name the file by "path" or by "id" (its index in file_list, as in compact prompts).
+    If the JSON is malformed or cut off, the entries that are complete are still returned.
+    """
+    return _parse_response(response_text, file_list, depth)[0]
+
+
+def _parse_response(
+    response_text: str, file_list: list[dict], depth: Optional[int] = None
+) -> tuple[list[tuple[str, str]], bool]:
+    """Like _parse_moves, but also returns whether the response was complete (nothing was recovered)."""
     valid_paths = {item["path"] for item in file_list}
 
     # Strip markdown code fences if present
@@ -138,25 +436,18 @@ def _parse_moves(response_text: str, file_list: list[dict]) -> list[tuple[str, s
     try:
         data = json.loads(text)
     except json.JSONDecodeError:
-        return []
+        get_profiler().count("malformed_responses")
+        parser = MoveStreamParser(file_list, depth)
+        moves = parser.feed(response_text)
+        return moves, parser.complete
 
-    moves_raw = data.get("moves")
+    moves_raw = data.get("moves") if isinstance(data, dict) else None
     if not isinstance(moves_raw, list):
-        return []
+        return [], False
 
     result = []
     for entry in moves_raw:
-        if not isinstance(entry, dict):
-            continue
-        path = entry.get("path")
-        target = entry.get("target_folder")
-        if path is None or target is None:
-            continue
-        path = str(path).strip()
-        target = str(target).strip().replace("\\", "/")
-        if path not in valid_paths:
-            continue
-        if not target:
-            target = "."
-        result.append((path, target))
-    return result
+        move = _validate_move(entry, file_list, valid_paths, depth)
+        if move is not None:
+            result.append(move)
+    return result, True
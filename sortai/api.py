@@ -0,0 +1,206 @@
+"""Python API: scan, plan and apply as awaitable stages, for services that organize many directories."""
+
+import functools
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Optional
+
+from sortai.ai import DEFAULT_CONCURRENCY, get_moves
+from sortai.backends import Backend, GeminiBackend
+from sortai.cache import open_moves_cache, open_preview_cache
+from sortai.cluster import get_cluster_moves
+from sortai.journal import Journal
+from sortai.organizer import apply_moves
+from sortai.profiling import get_profiler
+from sortai.reader import PREVIEW_TIMEOUT, expand_duplicates, list_files
+from sortai.rules import Rules, load_rules, split_by_rules
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+class MoveIssue(NamedTuple):
+    """A planned move that Organizer.apply skipped or failed to perform."""
+
+    path: str
+    target_folder: str
+    reason: str  # e.g. "destination exists" for a skip, the OS error message for an error
+
+
+class ApplyResult(NamedTuple):
+    """Outcome of Organizer.apply."""
+
+    moved: list[tuple[str, str]]  # (relative_path, new_relative_path)
+    skipped: list[MoveIssue]
+    errors: list[MoveIssue]
+    messages: list[str]  # one line per move, skip or error, as the CLI prints them
+
+
+def suggest_moves(
+    root: Path,
+    file_list: list[dict],
+    depth: int,
+    backend: Backend,
+    rules: Optional[Rules] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_cache: bool = True,
+    compact: bool = False,
+    cluster_size: Optional[int] = None,
+) -> list[tuple[str, str]]:
+    """
+    Classify files with local rules, then ask the model about the rest. Moves keep file_list order;
+    duplicates found by list_files(dedupe=True) follow their representative. With cluster_size,
+    the rest is clustered locally and only a few files per cluster are sent to the model.
+    """
+    moves: list[tuple[str, str]] = []
+    remaining = file_list
+    if rules is not None:
+        with get_profiler().stage("rules", files=len(file_list)):
+            moves, remaining = split_by_rules(root, file_list, rules, depth)
+        get_profiler().count("files_classified_locally", len(moves))
+
+    if remaining:
+        moves_cache = open_moves_cache() if use_cache else None
+        try:
+            folders = sorted({target for _, target in moves if target != "."})
+
+            def ask(files: list[dict]) -> list[tuple[str, str]]:
+                return get_moves(
+                    files,
+                    depth=depth,
+                    backend=backend,
+                    cache=moves_cache,
+                    concurrency=concurrency,
+                    folders=folders,
+                    compact=compact,
+                )
+
+            if cluster_size is None:
+                moves += ask(remaining)
+            else:
+                with get_profiler().stage("cluster", files=len(remaining)):
+                    moves += get_cluster_moves(remaining, ask, cluster_size)
+        finally:
+            if moves_cache is not None:
+                moves_cache.close()
+
+    order = {item["path"]: i for i, item in enumerate(file_list)}
+    moves.sort(key=lambda move: order[move[0]])
+    return expand_duplicates(moves, file_list)
+
+
+class Organizer:
+    """
+    Organizes one directory without prompts or SystemExit; errors are raised. scan(), plan() and
+    apply() run their blocking work on `executor` (the event loop's default executor if None),
+    so one process can organize many directories concurrently. Pass the same backend to several
+    Organizers to share one model client. If backend is None, a GeminiBackend for model_name is
+    created (MissingApiKeyError if GEMINI_API_KEY is not set). rules default to the user's rules
+    file; pass use_rules=False to send every file to the model.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        depth: int = 1,
+        backend: Optional[Backend] = None,
+        model_name: str = "gemini-2.5-flash",
+        executor: Optional["Executor"] = None,
+        jobs: int = 1,
+        timeout: Optional[float] = PREVIEW_TIMEOUT,
+        rules: Optional[Rules] = None,
+        use_rules: bool = True,
+        use_cache: bool = True,
+        dedupe: bool = False,
+        compact: bool = False,
+        cluster_size: Optional[int] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> None:
+        self.root = Path(root).resolve()
+        self.depth = depth
+        self.backend = backend if backend is not None else GeminiBackend(model_name)
+        self.executor = executor
+        self.jobs = jobs
+        self.timeout = timeout
+        self.rules = rules if rules is not None or not use_rules else load_rules()
+        self.use_cache = use_cache
+        self.dedupe = dedupe
+        self.compact = compact
+        self.cluster_size = cluster_size
+        self.concurrency = concurrency
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        # asyncio is already loaded whenever a coroutine runs; importing it here keeps `import sortai.api` light.
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args))
+
+    def _scan(self) -> list[dict]:
+        preview_cache = open_preview_cache() if self.use_cache else None
+        try:
+            return list_files(
+                self.root,
+                max_depth=self.depth,
+                jobs=self.jobs,
+                timeout=self.timeout,
+                cache=preview_cache,
+                dedupe=self.dedupe,
+            )
+        finally:
+            if preview_cache is not None:
+                preview_cache.close()
+
+    async def scan(self) -> list[dict]:
+        """List files with content previews (see list_files)."""
+        return await self._run(self._scan)
+
+    async def plan(self, file_list: Optional[list[dict]] = None) -> list[tuple[str, str]]:
+        """Suggest (relative_path, target_folder) moves for file_list, scanning first if it is None."""
+        if file_list is None:
+            file_list = await self.scan()
+        if not file_list:
+            return []
+        return await self._run(
+            suggest_moves,
+            self.root,
+            file_list,
+            self.depth,
+            self.backend,
+            self.rules,
+            self.concurrency,
+            self.use_cache,
+            self.compact,
+            self.cluster_size,
+        )
+
+    def _apply(self, moves: list[tuple[str, str]], journal: bool) -> ApplyResult:
+        result = ApplyResult([], [], [], [])
+
+        def run_moves(run: Optional[Journal]) -> list[tuple[str, str]]:
+            return apply_moves(
+                self.root,
+                moves,
+                echo=result.messages.append,
+                journal=run,
+                on_skip=lambda *issue: result.skipped.append(MoveIssue(*issue)),
+                on_error=lambda *issue: result.errors.append(MoveIssue(*issue)),
+            )
+
+        if not journal:
+            result.moved.extend(run_moves(None))
+            return result
+        run = Journal(self.root)
+        run.begin(moves)
+        try:
+            result.moved.extend(run_moves(run))
+            run.finish()
+        finally:
+            run.close()
+        return result
+
+    async def apply(self, moves: list[tuple[str, str]], journal: bool = True) -> ApplyResult:
+        """
+        Perform moves without asking. With journal, the run is recorded so `sortai --resume` and
+        `sortai --undo` work on it as on a CLI run.
+        """
+        return await self._run(self._apply, moves, journal)
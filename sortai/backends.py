@@ -0,0 +1,273 @@
+"""Model backends: Google Gemini, or any OpenAI-compatible HTTP server (llama.cpp, vLLM, Ollama, ...)."""
+
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Iterator, Optional
+
+from sortai.profiling import get_profiler
+
+GEMINI_API_KEY_URL = "https://aistudio.google.com/app/apikey"
+
+BACKEND_NAMES = ("gemini", "openai")
+
+# Seconds to wait for an OpenAI-compatible server to answer one request.
+HTTP_TIMEOUT = 300.0
+
+
+class MissingApiKeyError(Exception):
+    """Raised when GEMINI_API_KEY is not set."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            "GEMINI_API_KEY is not set. Get an API key at " + GEMINI_API_KEY_URL
+        )
+
+
+class Backend(ABC):
+    """A model that turns a prompt into response text. Implementations must be thread-safe."""
+
+    name = ""
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+
+    @property
+    def cache_id(self) -> str:
+        """Identifies this backend and model in the response cache."""
+        return f"{self.name}:{self.model_name}"
+
+    @property
+    def label(self) -> str:
+        """Human-readable name for messages ("Error calling <label>")."""
+        return self.name
+
+    @abstractmethod
+    def generate(self, prompt: str) -> str:
+        """Send prompt and return the response text."""
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Send prompt and yield the response text in chunks as it is generated."""
+        yield self.generate(prompt)
+
+    def list_models(self) -> list[str]:
+        """Model names this backend can serve, or [] if unknown."""
+        return []
+
+
+# One client per API key, shared by every GeminiBackend in the process.
+_gemini_clients: dict[str, Any] = {}
+# Model name -> the variant ("models/...", ...) the API accepted.
+_gemini_resolved: dict[str, str] = {}
+_gemini_lock = threading.Lock()
+
+
+def _gemini_client(api_key: str) -> Any:
+    with _gemini_lock:
+        client = _gemini_clients.get(api_key)
+        if client is None:
+            try:
+                from google import genai
+            except ImportError:
+                raise ImportError(
+                    "google-genai package not installed. Run: pip install google-genai"
+                )
+            client = _gemini_clients[api_key] = genai.Client(api_key=api_key)
+        return client
+
+
+def _prepend(first: Any, rest: Iterator[Any]) -> Iterator[Any]:
+    yield first
+    yield from rest
+
+
+def _is_not_found(error: Exception) -> bool:
+    return "404" in str(error) or "not found" in str(error).lower()
+
+
+class GeminiBackend(Backend):
+    """
+    Google Gemini through google-genai. The client is created on first use and reused; the model
+    name variant that works is remembered, so later requests do not retry the others.
+    Raises MissingApiKeyError if no API key is given and GEMINI_API_KEY is not set.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model_name: str = "gemini-2.5-flash", api_key: Optional[str] = None) -> None:
+        super().__init__(model_name)
+        api_key = (api_key or os.environ.get("GEMINI_API_KEY") or "").strip()
+        if not api_key:
+            raise MissingApiKeyError()
+        self.api_key = api_key
+
+    @property
+    def cache_id(self) -> str:
+        return self.model_name
+
+    @property
+    def label(self) -> str:
+        return "Gemini"
+
+    def _call(self, call: Callable[[str], Any]) -> Any:
+        """Run call(model_variant), trying model name variants until one is not a 404."""
+        resolved = _gemini_resolved.get(self.model_name)
+        model_variations = [resolved] if resolved else [
+            self.model_name,
+            f"models/{self.model_name}",
+            f"publishers/google/models/{self.model_name}",
+        ]
+
+        last_error = None
+        for model_variant in model_variations:
+            try:
+                result = call(model_variant)
+            except Exception as e:
+                last_error = e
+                if not _is_not_found(e):
+                    # Not a 404, re-raise immediately
+                    raise
+                get_profiler().count("model_name_retries")
+                continue
+            _gemini_resolved[self.model_name] = model_variant
+            return result
+
+        # If all variations failed, try to list available models
+        available = self.list_models()
+        if available:
+            raise ValueError(
+                f"Model '{self.model_name}' not found. Available models: {', '.join(available[:10])}"
+            )
+        raise ValueError(
+            f"Model '{self.model_name}' not found. Common models: gemini-1.5-flash, gemini-1.5-pro, gemini-2.5-flash"
+        ) from last_error
+
+    def generate(self, prompt: str) -> str:
+        client = _gemini_client(self.api_key)
+        response = self._call(lambda model: client.models.generate_content(model=model, contents=prompt))
+        return (response.text or "").strip()
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        client = _gemini_client(self.api_key)
+
+        def start(model: str) -> Iterator[Any]:
+            # The request is sent lazily; pull the first chunk so a 404 surfaces here.
+            chunks = iter(client.models.generate_content_stream(model=model, contents=prompt))
+            first = next(chunks, None)
+            return chunks if first is None else _prepend(first, chunks)
+
+        for chunk in self._call(start):
+            if chunk.text:
+                yield chunk.text
+
+    def list_models(self) -> list[str]:
+        try:
+            models = _gemini_client(self.api_key).models.list()
+            model_names = []
+            for m in models:
+                if hasattr(m, "name"):
+                    name = m.name.split("/")[-1] if "/" in m.name else m.name
+                    model_names.append(name)
+            return model_names
+        except Exception:
+            return []
+
+
+class OpenAICompatibleBackend(Backend):
+    """
+    Any server that implements POST {base_url}/chat/completions, e.g. llama.cpp's llama-server,
+    vLLM or Ollama (base_url like http://localhost:8080/v1). The API key is optional.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        base_url: str,
+        model_name: str,
+        api_key: Optional[str] = None,
+        timeout: float = HTTP_TIMEOUT,
+    ) -> None:
+        super().__init__(model_name)
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY")
+        self.timeout = timeout
+
+    @property
+    def cache_id(self) -> str:
+        return f"{self.name}:{self.base_url}:{self.model_name}"
+
+    @property
+    def label(self) -> str:
+        return f"model server {self.base_url}"
+
+    def _open(self, path: str, payload: Optional[dict] = None) -> Any:
+        # urllib.request pulls in http.client, ssl and email; only pay for them when a request is made.
+        import urllib.error
+        import urllib.request
+
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            # Keep the status code in the message so rate limits (429) are retried.
+            raise RuntimeError(f"{e.code} {e.reason} from {self.base_url}{path}") from e
+        except urllib.error.URLError as e:
+            raise RuntimeError(f"Could not reach {self.base_url}: {e.reason}") from e
+
+    def _request(self, path: str, payload: Optional[dict] = None) -> dict:
+        with self._open(path, payload) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    def _payload(self, prompt: str) -> dict:
+        return {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0,
+        }
+
+    def generate(self, prompt: str) -> str:
+        data = self._request("/chat/completions", self._payload(prompt))
+        try:
+            return (data["choices"][0]["message"]["content"] or "").strip()
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"Unexpected response from {self.base_url}: {str(data)[:200]}")
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        # Server-sent events: one "data: {json}" line per chunk, ending with "data: [DONE]".
+        with self._open("/chat/completions", {**self._payload(prompt), "stream": True}) as response:
+            for raw in response:
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    text = json.loads(data)["choices"][0]["delta"].get("content")
+                except (json.JSONDecodeError, KeyError, IndexError, TypeError, AttributeError):
+                    continue
+                if text:
+                    yield text
+
+    def list_models(self) -> list[str]:
+        try:
+            return [m["id"] for m in self._request("/models").get("data", [])]
+        except Exception:
+            return []
+
+
+def get_backend(name: str, model_name: str, base_url: Optional[str] = None) -> Backend:
+    """Create the backend called name ('gemini' or 'openai'). 'openai' needs base_url."""
+    if name == "gemini":
+        return GeminiBackend(model_name)
+    if name == "openai":
+        if not base_url:
+            raise ValueError("The openai backend needs a server URL (--base-url).")
+        return OpenAICompatibleBackend(base_url, model_name)
+    raise ValueError(f"Unknown backend '{name}'. Choose one of: {', '.join(BACKEND_NAMES)}")
@@ -0,0 +1,230 @@
+"""Benchmark the scan -> prompt -> parse -> move pipeline on a synthetic tree, with a stub model."""
+
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+from typing import Callable, Optional
+
+import click
+
+from sortai import __version__
+from sortai.ai import _build_prompt, _parse_moves
+from sortai.organizer import apply_moves
+from sortai.reader import get_content_preview, list_files
+
+# Default share of each file type in the synthetic tree.
+DEFAULT_MIX = {".txt": 3, ".md": 1, ".csv": 1, ".pdf": 1, ".docx": 1, ".jpg": 2, ".zip": 1}
+
+# Folder the stub model picks for each extension.
+STUB_FOLDERS = {
+    ".txt": "notes",
+    ".md": "notes",
+    ".csv": "data",
+    ".pdf": "documents",
+    ".docx": "documents",
+    ".jpg": "images",
+    ".zip": "archives",
+}
+
+_WORDS = "invoice report meeting budget draft summary project travel receipt notes plan review".split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def _minimal_pdf(text: str) -> bytes:
+    """A one-page PDF showing text, with a correct xref table."""
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R"
+        b" /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _minimal_docx(path: Path, paragraphs: list[str]) -> None:
+    """Write a docx containing just word/document.xml with the given paragraphs."""
+    ns = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{p}</w:t></w:r></w:p>" for p in paragraphs)
+    xml = f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{ns}"><w:body>{body}</w:body></w:document>'
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("word/document.xml", xml)
+
+
+def make_tree(root: Path, files: int, mix: dict[str, int], subdirs: int = 0, seed: int = 0) -> None:
+    """Create `files` synthetic files under root, spread over `subdirs` subfolders, with extensions drawn from mix."""
+    rng = random.Random(seed)
+    exts = list(mix)
+    weights = [mix[e] for e in exts]
+    dirs = [root] + [root / f"dir{i}" for i in range(subdirs)]
+    for d in dirs:
+        d.mkdir(parents=True, exist_ok=True)
+    for i in range(files):
+        ext = rng.choices(exts, weights)[0]
+        path = rng.choice(dirs) / f"{rng.choice(_WORDS)}_{i}{ext}"
+        if ext in (".txt", ".md"):
+            path.write_text(_sentence(rng, 200), encoding="utf-8")
+        elif ext == ".csv":
+            path.write_text("\n".join(",".join(str(rng.randint(0, 999)) for _ in range(5)) for _ in range(50)))
+        elif ext == ".pdf":
+            path.write_bytes(_minimal_pdf(_sentence(rng, 20)))
+        elif ext == ".docx":
+            _minimal_docx(path, [_sentence(rng, 30) for _ in range(20)])
+        else:
+            path.write_bytes(rng.randbytes(4096) if hasattr(rng, "randbytes") else os.urandom(4096))
+
+
+def stub_response(file_list: list[dict]) -> str:
+    """Model response a well-behaved LLM would give: one folder per extension."""
+    moves = [
+        {"path": item["path"], "target_folder": STUB_FOLDERS.get(Path(item["path"]).suffix.lower(), "other")}
+        for item in file_list
+    ]
+    return "```json\n" + json.dumps({"moves": moves}) + "\n```"
+
+
+def _measure(name: str, items: int, fn: Callable[[], object], trace_memory: bool, results: dict):
+    """Time fn() and record seconds, items/second and optionally peak traced memory under results[name]."""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    value = fn()
+    seconds = time.perf_counter() - start
+    stage = {"seconds": round(seconds, 6), "items": items}
+    stage["items_per_second"] = round(items / seconds, 1) if seconds > 0 else None
+    if trace_memory:
+        stage["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    results[name] = stage
+    return value
+
+
+def run_benchmark(
+    files: int,
+    mix: dict[str, int],
+    subdirs: int = 0,
+    jobs: int = 1,
+    trace_memory: bool = False,
+    seed: int = 0,
+    workdir: Optional[Path] = None,
+) -> dict:
+    """Build a synthetic tree and time each pipeline stage. Returns a JSON-serializable report."""
+    stages: dict = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        root = Path(tmp)
+        _measure("make_tree", files, lambda: make_tree(root, files, mix, subdirs, seed), False, stages)
+        file_list = _measure(
+            "list_files", files, lambda: list_files(root, max_depth=1, jobs=jobs), trace_memory, stages
+        )
+
+        by_ext: dict[str, list[Path]] = {}
+        for item in file_list:
+            by_ext.setdefault(Path(item["path"]).suffix.lower(), []).append(root / item["path"])
+        previews = {}
+        for ext, paths in sorted(by_ext.items()):
+            _measure(ext, len(paths), lambda: [get_content_preview(p) for p in paths], False, previews)
+        stages["get_content_preview"] = previews
+
+        prompt = _measure("build_prompt", len(file_list), lambda: _build_prompt(file_list, 1), trace_memory, stages)
+        stages["build_prompt"]["prompt_chars"] = len(prompt)
+        response = stub_response(file_list)
+        moves = _measure(
+            "parse_moves", len(file_list), lambda: _parse_moves(response, file_list), trace_memory, stages
+        )
+        _measure(
+            "apply_moves", len(moves), lambda: apply_moves(root, moves, echo=lambda _: None), trace_memory, stages
+        )
+
+    return {
+        "sortai": __version__,
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "files": files,
+        "subdirs": subdirs,
+        "jobs": jobs,
+        "mix": mix,
+        "stages": stages,
+    }
+
+
+def _parse_mix(value: Optional[str]) -> dict[str, int]:
+    """Parse '.txt=3,.pdf=1' into {'.txt': 3, '.pdf': 1}."""
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in value.split(","):
+        ext, _, weight = part.partition("=")
+        ext = ext.strip().lower()
+        if not ext.startswith("."):
+            ext = "." + ext
+        try:
+            mix[ext] = int(weight or 1)
+        except ValueError:
+            raise click.BadParameter(f"bad weight in {part!r}", param_hint="--mix")
+    return mix
+
+
+@click.command()
+@click.option("--files", type=click.IntRange(min=1), default=1000, help="Number of synthetic files (default: 1000).")
+@click.option("--subdirs", type=click.IntRange(min=0), default=0, help="Spread files over N subfolders (default: 0).")
+@click.option(
+    "--mix",
+    default=None,
+    metavar="EXT=W,...",
+    help="File-type weights, e.g. '.txt=3,.pdf=1,.jpg=2' (default: a mix of all supported types).",
+)
+@click.option("--jobs", "-j", type=click.IntRange(min=1), default=1, help="Preview workers for list_files (default: 1).")
+@click.option("--memory", is_flag=True, default=False, help="Record peak traced memory per stage (slower).")
+@click.option("--seed", type=int, default=0, help="Random seed for the synthetic tree (default: 0).")
+@click.option(
+    "--output",
+    "-o",
+    "output_path",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=None,
+    help="Write the JSON report to FILE instead of stdout.",
+)
+def main(
+    files: int,
+    subdirs: int,
+    mix: Optional[str],
+    jobs: int,
+    memory: bool,
+    seed: int,
+    output_path: Optional[Path],
+) -> None:
+    """Benchmark sortai's pipeline stages on a synthetic directory (no API calls)."""
+    report = run_benchmark(files, _parse_mix(mix), subdirs=subdirs, jobs=jobs, trace_memory=memory, seed=seed)
+    text = json.dumps(report, indent=2)
+    if output_path is None:
+        click.echo(text)
+    else:
+        output_path.write_text(text + "\n", encoding="utf-8")
+        click.echo(f"Wrote {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""On-disk caches under ~/.cache/sortai so repeat runs on an unchanged tree skip work."""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+# Maximum number of previews kept on disk; least recently used rows are evicted past this.
+PREVIEW_CACHE_MAX_ENTRIES = 200_000
+
+# Maximum number of Gemini responses kept on disk, and how long (seconds) one stays valid.
+MOVES_CACHE_MAX_ENTRIES = 500
+MOVES_CACHE_TTL = 7 * 24 * 3600
+
+# Writes are buffered and flushed in one short transaction once this many are pending, and at close().
+CACHE_WRITE_BATCH = 1000
+
+
+def cache_dir() -> Path:
+    """Return the sortai cache directory ($XDG_CACHE_HOME/sortai or ~/.cache/sortai)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "sortai"
+
+
+class _SqliteCache:
+    """
+    One SQLite table with a `key` primary key and a `last_used` column for LRU eviction.
+    The database is in WAL mode and writes are batched, so the write lock is only held for a
+    moment and several sortai processes can share a cache. Failed writes only lose cache entries.
+    """
+
+    table = ""
+    columns = ""
+    insert = ""  # INSERT OR REPLACE statement for one row, run by _flush()
+
+    def __init__(self, path: Path, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        import sqlite3
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, {self.columns}, last_used REAL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_used ON {self.table} (last_used)")
+        self._conn.commit()
+        self._rows: list[tuple] = []
+        self._touched: set[str] = set()
+
+    def _write(self, row: tuple) -> None:
+        self._rows.append(row)
+        if len(self._rows) + len(self._touched) >= CACHE_WRITE_BATCH:
+            self._flush()
+
+    def _touch(self, key: str) -> None:
+        self._touched.add(key)
+        if len(self._rows) + len(self._touched) >= CACHE_WRITE_BATCH:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write buffered rows and last_used updates in one transaction."""
+        import sqlite3
+
+        rows, touched = self._rows, self._touched
+        self._rows, self._touched = [], set()
+        if not rows and not touched:
+            return
+        now = time.time()
+        try:
+            with self._conn:
+                self._conn.executemany(self.insert, rows)
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET last_used = ? WHERE key = ?", [(now, key) for key in touched]
+                )
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters for this session."""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._rows, self._touched = [], set()
+        with self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def close(self) -> None:
+        """Flush buffered writes, evict least recently used rows beyond max_entries, and close."""
+        import sqlite3
+
+        self._flush()
+        try:
+            with self._conn:
+                cur = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN"
+                    f" (SELECT key FROM {self.table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self.evictions += max(cur.rowcount, 0)
+        except sqlite3.Error:
+            pass
+        finally:
+            self._conn.close()
+
+
+class PreviewCache(_SqliteCache):
+    """
+    Cache of content previews keyed by (path, size, mtime_ns, inode).
+    A row whose fingerprint no longer matches the file on disk counts as a miss.
+    """
+
+    table = "previews"
+    columns = "size INTEGER, mtime_ns INTEGER, inode INTEGER, preview TEXT"
+    insert = (
+        "INSERT OR REPLACE INTO previews (key, size, mtime_ns, inode, preview, last_used)"
+        " VALUES (?, ?, ?, ?, ?, ?)"
+    )
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = PREVIEW_CACHE_MAX_ENTRIES) -> None:
+        super().__init__(path or cache_dir() / "previews.sqlite3", max_entries)
+
+    def get(self, path: Path, fingerprint: tuple[int, int, int]) -> tuple[bool, Optional[str]]:
+        """
+        Return (hit, preview) for path with fingerprint (size, mtime_ns, inode).
+        preview may be None on a hit (file had no extractable text).
+        """
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, inode, preview FROM previews WHERE key = ?", (str(path),)
+        ).fetchone()
+        if row is None or tuple(row[:3]) != tuple(fingerprint):
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._touch(str(path))
+        return True, row[3]
+
+    def put(self, path: Path, fingerprint: tuple[int, int, int], preview: Optional[str]) -> None:
+        """Store preview for path with its (size, mtime_ns, inode) fingerprint."""
+        self._write((str(path), *fingerprint, preview, time.time()))
+
+
+class MovesCache(_SqliteCache):
+    """
+    Content-addressed cache of parsed Gemini moves, keyed by a hash of prompt, model and depth.
+    Entries older than ttl seconds count as a miss.
+    """
+
+    table = "moves"
+    columns = "moves TEXT, created REAL"
+    insert = "INSERT OR REPLACE INTO moves (key, moves, created, last_used) VALUES (?, ?, ?, ?)"
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_entries: int = MOVES_CACHE_MAX_ENTRIES,
+        ttl: float = MOVES_CACHE_TTL,
+    ) -> None:
+        super().__init__(path or cache_dir() / "moves.sqlite3", max_entries)
+        self.ttl = ttl
+
+    @staticmethod
+    def key(prompt: str, model_name: str, depth: int) -> str:
+        """Hash identifying one request."""
+        return hashlib.sha256(f"{model_name}\0{depth}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[list[tuple[str, str]]]:
+        """Return cached moves for key, or None on a miss or expired entry."""
+        row = self._conn.execute("SELECT moves, created FROM moves WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(key)
+        return [(path, target) for path, target in json.loads(row[0])]
+
+    def put(self, key: str, moves: list[tuple[str, str]]) -> None:
+        """Store parsed moves under key."""
+        now = time.time()
+        self._write((key, json.dumps(moves), now, now))
+
+
+def open_preview_cache() -> Optional[PreviewCache]:
+    """Open the default preview cache, or return None if the cache directory is unusable."""
+    import sqlite3
+
+    try:
+        return PreviewCache()
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def open_moves_cache() -> Optional[MovesCache]:
+    """Open the default moves cache, or return None if the cache directory is unusable."""
+    import sqlite3
+
+    try:
+        return MovesCache()
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def clear_caches() -> None:
+    """Remove all cached previews and Gemini responses."""
+    for opener in (open_preview_cache, open_moves_cache):
+        cache = opener()
+        if cache is not None:
+            cache.clear()
+            cache.close()
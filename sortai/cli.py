@@ -1,14 +1,124 @@
 """Click CLI entrypoint for sortai."""
 
-import os
 from pathlib import Path
+from typing import Iterator
 
 import click
 
 from sortai import __version__
-from sortai.ai import GEMINI_API_KEY_URL, MissingApiKeyError, get_moves, list_available_models
+from sortai.ai import DEFAULT_CONCURRENCY, iter_moves
+from sortai.api import suggest_moves
+from sortai.backends import BACKEND_NAMES, GEMINI_API_KEY_URL, Backend, MissingApiKeyError, get_backend
+from sortai.cache import clear_caches, open_moves_cache, open_preview_cache
+from sortai.cluster import DEFAULT_CLUSTER_SIZE, require_numpy
+from sortai.journal import Journal, remaining_moves, undo_moves
 from sortai.organizer import apply_moves, confirm, dry_run
-from sortai.reader import list_files
+from sortai.plan import check_plan, load_plan, save_plan
+from sortai.profiling import get_profiler, start_profiling, stop_profiling
+from sortai.reader import describe_files, list_files
+from sortai.rules import Rules, load_rules, split_by_rules
+from sortai.watch import POLL_INTERVAL, watch
+
+
+def _make_backend(name: str, model: str, base_url: str | None) -> Backend:
+    """Create the model backend, or print the problem and exit."""
+    try:
+        return get_backend(name, model, base_url)
+    except MissingApiKeyError:
+        click.echo("Error: GEMINI_API_KEY is not set.", err=True)
+        click.echo(f"Get an API key at: {GEMINI_API_KEY_URL}", err=True)
+        raise SystemExit(1)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        raise SystemExit(1)
+
+
+def _stream_moves(
+    root: Path,
+    file_list: list[dict],
+    depth: int,
+    backend: Backend,
+    rules: Rules | None,
+    no_cache: bool,
+    compact: bool = False,
+) -> Iterator[tuple[str, str]]:
+    """
+    Like suggest_moves, but yields moves as they are decided: local-rule moves first, then each
+    model move as soon as it arrives in the streamed response.
+    """
+    remaining = file_list
+    folders: list[str] = []
+    duplicates = {item["path"]: item["duplicates"] for item in file_list if item.get("duplicates")}
+    if rules is not None:
+        with get_profiler().stage("rules", files=len(file_list)):
+            local, remaining = split_by_rules(root, file_list, rules, depth)
+        get_profiler().count("files_classified_locally", len(local))
+        folders = sorted({target for _, target in local if target != "."})
+        for path, target in local:
+            yield path, target
+            yield from ((dup, target) for dup in duplicates.get(path, ()))
+
+    if remaining:
+        moves_cache = None if no_cache else open_moves_cache()
+        try:
+            for path, target in iter_moves(
+                remaining, depth=depth, backend=backend, cache=moves_cache, folders=folders, compact=compact
+            ):
+                yield path, target
+                yield from ((dup, target) for dup in duplicates.get(path, ()))
+        finally:
+            if moves_cache is not None:
+                moves_cache.close()
+
+
+def _finish_profile(show: bool, output_path: Path | None) -> None:
+    """Print and/or write the collected profile (registered as a Click close callback)."""
+    profiler = stop_profiling()
+    if profiler is None:
+        return
+    if show:
+        profiler.report(echo=lambda line: click.echo(line, err=True))
+    if output_path is not None:
+        try:
+            profiler.write_trace(str(output_path))
+        except OSError as e:
+            click.echo(f"Error writing profile: {e}", err=True)
+            return
+        click.echo(f"Profile written to {output_path} (Chrome trace format).", err=True)
+
+
+def _review_and_apply(
+    root: Path,
+    moves: list[tuple[str, str]],
+    apply: bool,
+    shown: bool = False,
+    tree: bool = False,
+    limit: int = 0,
+    depth: int | None = None,
+) -> None:
+    """
+    Show the dry-run (unless already shown); with apply, confirm and perform the moves under a
+    journal. Always exits.
+    """
+    if not shown:
+        moves = dry_run(root, moves, echo=click.echo, tree=tree, limit=limit, depth=depth)
+    if not apply:
+        click.echo("Run with --apply to perform moves.")
+        raise SystemExit(0)
+
+    if not confirm(echo=click.echo):
+        click.echo("Aborted.")
+        raise SystemExit(0)
+
+    journal = Journal(root)
+    journal.begin(moves)
+    try:
+        apply_moves(root, moves, echo=click.echo, journal=journal)
+        journal.finish()
+    finally:
+        journal.close()
+    click.echo("Done.")
+    raise SystemExit(0)
 
 
 @click.command()
@@ -34,7 +144,154 @@ from sortai.reader import list_files
     "--model",
     type=str,
     default="gemini-2.5-flash",
-    help="Gemini model name (default: gemini-2.5-flash).",
+    help="Model name (default: gemini-2.5-flash).",
+)
+@click.option(
+    "--backend",
+    "backend_name",
+    type=click.Choice(BACKEND_NAMES),
+    default="gemini",
+    help="Model backend: Google Gemini, or an OpenAI-compatible server such as llama.cpp (default: gemini).",
+)
+@click.option(
+    "--base-url",
+    envvar="SORTAI_BASE_URL",
+    default=None,
+    metavar="URL",
+    help="Server URL for --backend openai, e.g. http://localhost:8080/v1 (or set SORTAI_BASE_URL).",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Extract content previews with N parallel workers (default: 1).",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CONCURRENCY,
+    help=f"Max Gemini requests in flight when a large directory is split into batches (default: {DEFAULT_CONCURRENCY}).",
+)
+@click.option(
+    "--compact",
+    is_flag=True,
+    default=False,
+    help="Use a shorter prompt (files grouped by folder, numeric ids, trimmed previews) to fit more files per request.",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help="Stream the model response and show each move as soon as it arrives (batches are sent one at a time).",
+)
+@click.option(
+    "--tree",
+    "tree_view",
+    is_flag=True,
+    default=False,
+    help="Show the dry-run as a folder tree with file counts instead of one line per file.",
+)
+@click.option(
+    "--limit",
+    type=click.IntRange(min=0),
+    default=0,
+    help="With --tree, also list up to N files under each folder (default: 0, counts only).",
+)
+@click.option(
+    "--cluster",
+    is_flag=True,
+    default=False,
+    help="Cluster similar files locally and ask the model only about a few per cluster (needs numpy).",
+)
+@click.option(
+    "--cluster-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CLUSTER_SIZE,
+    show_default=True,
+    help="Average number of files per cluster with --cluster.",
+)
+@click.option(
+    "--dedupe",
+    is_flag=True,
+    default=False,
+    help="Send only one copy of byte-identical files to Gemini; the copies follow it.",
+)
+@click.option(
+    "--rules",
+    "rules_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="JSON file of {\"glob pattern\": \"folder\"} rules applied before Gemini (default: ~/.config/sortai/rules.json if present).",
+)
+@click.option(
+    "--no-rules",
+    is_flag=True,
+    default=False,
+    help="Send every file to Gemini instead of classifying obvious ones (images, videos, archives, ...) locally.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Do not read or write the on-disk cache in ~/.cache/sortai.",
+)
+@click.option(
+    "--clear-cache",
+    is_flag=True,
+    default=False,
+    help="Remove cached previews and Gemini responses and exit.",
+)
+@click.option(
+    "--watch",
+    "watch_mode",
+    is_flag=True,
+    default=False,
+    help="Keep running and organize only new or changed files. With --apply, moves happen without a confirmation prompt.",
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0.1),
+    default=POLL_INTERVAL,
+    help=f"Seconds between polls in --watch mode when watchdog is not installed (default: {POLL_INTERVAL:g}).",
+)
+@click.option(
+    "--save-plan",
+    "save_plan_path",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=None,
+    help="Write the suggested moves (with file fingerprints) to FILE for a later --plan run.",
+)
+@click.option(
+    "--plan",
+    "plan_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Use moves from a file written by --save-plan instead of scanning and calling Gemini.",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help="Finish an interrupted --apply run on PATH without calling Gemini again.",
+)
+@click.option(
+    "--undo",
+    is_flag=True,
+    default=False,
+    help="Move the files of the last --apply run on PATH back where they were.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Print time spent per stage, file counts, prompt size and retries when done.",
+)
+@click.option(
+    "--profile-output",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    default=None,
+    help="Write per-stage timings to FILE as a Chrome trace (chrome://tracing, Perfetto).",
 )
 @click.option(
     "--version",
@@ -54,6 +311,29 @@ def main(
     apply: bool,
     depth: int,
     model: str,
+    backend_name: str,
+    base_url: str | None,
+    jobs: int,
+    concurrency: int,
+    compact: bool,
+    stream: bool,
+    tree_view: bool,
+    limit: int,
+    cluster: bool,
+    cluster_size: int,
+    dedupe: bool,
+    rules_path: Path | None,
+    no_rules: bool,
+    no_cache: bool,
+    clear_cache: bool,
+    watch_mode: bool,
+    interval: float,
+    save_plan_path: Path | None,
+    plan_path: Path | None,
+    resume: bool,
+    undo: bool,
+    profile: bool,
+    profile_output: Path | None,
     show_version: bool,
     list_models: bool,
 ) -> None:
@@ -61,13 +341,18 @@ def main(
     if show_version:
         click.echo(f"sortai {__version__}")
         raise SystemExit(0)
+
+    if profile or profile_output is not None:
+        start_profiling()
+        click.get_current_context().call_on_close(lambda: _finish_profile(profile, profile_output))
+
+    if clear_cache:
+        clear_caches()
+        click.echo("Cache cleared.")
+        raise SystemExit(0)
     
     if list_models:
-        if not (os.environ.get("GEMINI_API_KEY") or "").strip():
-            click.echo("Error: GEMINI_API_KEY is not set.", err=True)
-            click.echo(f"Get an API key at: {GEMINI_API_KEY_URL}", err=True)
-            raise SystemExit(1)
-        models = list_available_models()
+        models = _make_backend(backend_name, model, base_url).list_models()
         if models:
             click.echo("Available models:")
             for m in models:
@@ -76,6 +361,16 @@ def main(
             click.echo("Could not list models. Check your API key.", err=True)
         raise SystemExit(0)
 
+    loaded_plan = None
+    if plan_path is not None:
+        try:
+            loaded_plan = load_plan(plan_path)
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            raise SystemExit(1)
+        if path is None:
+            path = Path(loaded_plan.root)
+
     if path is None:
         click.echo("Error: PATH is required. Use --help for usage.", err=True)
         raise SystemExit(1)
@@ -85,41 +380,142 @@ def main(
         click.echo(f"Error: not a directory: {path}", err=True)
         raise SystemExit(1)
 
-    if not (os.environ.get("GEMINI_API_KEY") or "").strip():
-        click.echo("Error: GEMINI_API_KEY is not set.", err=True)
-        click.echo(f"Get an API key at: {GEMINI_API_KEY_URL}", err=True)
-        raise SystemExit(1)
+    if resume or undo:
+        journal = Journal(root)
+        run = journal.load()
+        if undo:
+            if run is None or run.undone or not run.done:
+                click.echo("Nothing to undo.")
+                raise SystemExit(0)
+            click.echo(f"Undo – would restore {len(run.done)} file(s) moved by the last run.")
+            if not confirm(echo=click.echo):
+                click.echo("Aborted.")
+                raise SystemExit(0)
+            undo_moves(root, run, echo=click.echo)
+            journal.mark_undone()
+            click.echo("Done.")
+            raise SystemExit(0)
+
+        # After --undo the files are back where they were; resuming would half-organize the tree.
+        moves = remaining_moves(run) if run is not None and not run.finished and not run.undone else []
+        if not moves:
+            click.echo("Nothing to resume.")
+            raise SystemExit(0)
+        dry_run(root, moves, echo=click.echo, tree=tree_view, limit=limit)
+        if not confirm(echo=click.echo):
+            click.echo("Aborted.")
+            raise SystemExit(0)
+        journal.reopen()
+        try:
+            apply_moves(root, moves, echo=click.echo, journal=journal)
+            journal.finish()
+        finally:
+            journal.close()
+        click.echo("Done.")
+        raise SystemExit(0)
+
+    if loaded_plan is not None:
+        moves, stale = check_plan(root, loaded_plan)
+        for rel_path in stale:
+            click.echo(f"  Skip (changed since plan): {rel_path}")
+        if not moves:
+            click.echo("No moves left in plan.")
+            raise SystemExit(0)
+        _review_and_apply(root, moves, apply, tree=tree_view, limit=limit, depth=loaded_plan.depth)
+
+    backend = _make_backend(backend_name, model, base_url)
+
+    if cluster:
+        try:
+            require_numpy()
+        except ImportError as e:
+            click.echo(f"Error: {e}", err=True)
+            raise SystemExit(1)
+    suggest_cluster_size = cluster_size if cluster else None
+
+    rules = None
+    if not no_rules:
+        try:
+            rules = load_rules(rules_path)
+        except ValueError as e:
+            click.echo(f"Error: {e}", err=True)
+            raise SystemExit(1)
+
+    if watch_mode:
+        def organize(paths: list[str]) -> tuple[list[str], list[tuple[str, str]]]:
+            preview_cache = None if no_cache else open_preview_cache()
+            try:
+                file_list = describe_files(root, paths, jobs=jobs, cache=preview_cache)
+            finally:
+                if preview_cache is not None:
+                    preview_cache.close()
+            try:
+                moves = suggest_moves(
+                    root, file_list, depth, backend, rules, concurrency, not no_cache, compact, suggest_cluster_size
+                )
+            except Exception as e:
+                click.echo(f"Error calling {backend.label}: {e}", err=True)
+                return [], []
+            if not moves:
+                return paths, []
+            moves = dry_run(root, moves, echo=click.echo, tree=tree_view, limit=limit, depth=depth)
+            if not apply:
+                return paths, []
+            failed: set[str] = set()
+            moved = apply_moves(root, moves, echo=click.echo, on_error=lambda path, *_: failed.add(path))
+            return [p for p in paths if p not in failed], moved
+
+        try:
+            watch(root, organize, echo=click.echo, max_depth=depth, interval=interval, dry_run=not apply)
+        except KeyboardInterrupt:
+            click.echo("Stopped.")
+        raise SystemExit(0)
 
-    file_list = list_files(root, max_depth=depth)
+    preview_cache = None if no_cache else open_preview_cache()
+    try:
+        file_list = list_files(root, max_depth=depth, jobs=jobs, cache=preview_cache, dedupe=dedupe)
+    finally:
+        if preview_cache is not None:
+            preview_cache.close()
     if not file_list:
         click.echo("No files found to organize.")
         raise SystemExit(0)
 
-    try:
-        moves = get_moves(file_list, depth=depth, model_name=model)
-    except MissingApiKeyError as e:
-        click.echo(f"Error: {e}", err=True)
-        click.echo(f"Get an API key at: {GEMINI_API_KEY_URL}", err=True)
-        raise SystemExit(1)
-    except Exception as e:
-        click.echo(f"Error calling Gemini: {e}", err=True)
-        raise SystemExit(1)
+    if stream and not cluster:
+        try:
+            moves = dry_run(
+                root,
+                _stream_moves(root, file_list, depth, backend, rules, no_cache, compact),
+                echo=click.echo,
+                tree=tree_view,
+                limit=limit,
+                depth=depth,
+            )
+        except Exception as e:
+            click.echo(f"Error calling {backend.label}: {e}", err=True)
+            raise SystemExit(1)
+    else:
+        try:
+            moves = suggest_moves(
+                root, file_list, depth, backend, rules, concurrency, not no_cache, compact, suggest_cluster_size
+            )
+        except Exception as e:
+            click.echo(f"Error calling {backend.label}: {e}", err=True)
+            raise SystemExit(1)
 
     if not moves:
         click.echo("No moves suggested.")
         raise SystemExit(0)
 
-    dry_run(root, moves, echo=click.echo)
-    if not apply:
-        click.echo("Run with --apply to perform moves.")
-        raise SystemExit(0)
-
-    if not confirm(echo=click.echo):
-        click.echo("Aborted.")
-        raise SystemExit(0)
+    if save_plan_path is not None:
+        try:
+            save_plan(save_plan_path, root, moves, depth)
+        except OSError as e:
+            click.echo(f"Error writing plan: {e}", err=True)
+            raise SystemExit(1)
+        click.echo(f"Plan saved to {save_plan_path}.")
 
-    apply_moves(root, moves, echo=click.echo)
-    click.echo("Done.")
+    _review_and_apply(root, moves, apply, shown=stream and not cluster, tree=tree_view, limit=limit, depth=depth)
 
 
 if __name__ == "__main__":
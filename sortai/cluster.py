@@ -0,0 +1,137 @@
+"""Cluster similar files locally so the model only names a few representatives per cluster."""
+
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Any, Callable
+
+# Width of the hashed n-gram vectors.
+VECTOR_DIM = 256
+
+# Average files per cluster; the number of clusters is the file count divided by this.
+DEFAULT_CLUSTER_SIZE = 25
+
+# Files per cluster sent to the model; the rest of the cluster follows their majority folder.
+REPRESENTATIVES = 3
+
+KMEANS_ITERATIONS = 15
+
+# Rows of the distance matrix computed at once, to bound memory on large trees.
+KMEANS_CHUNK = 4096
+
+# Preview words that contribute to a file's vector.
+PREVIEW_WORDS = 50
+
+_WORD_RE = re.compile(r"[a-z]+|\d+")
+
+
+def require_numpy() -> Any:
+    """Return the numpy module. Raises ImportError with install instructions if it is missing."""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy package not installed. Run: pip install 'sortai[cluster]'")
+    return numpy
+
+
+def _features(item: dict) -> list[tuple[str, float]]:
+    """Weighted features of one file: extension, filename words and trigrams, preview words."""
+    name = item["path"].rsplit("/", 1)[-1].lower()
+    stem, dot, ext = name.rpartition(".")
+    if not dot:
+        stem, ext = name, ""
+    features = [("ext:" + ext, 3.0)]
+    for word in _WORD_RE.findall(stem):
+        # Digits (dates, counters) say little about what a file is.
+        features.append(("w:#" if word.isdigit() else "w:" + word, 1.0))
+    padded = f" {stem} "
+    features.extend(("g:" + padded[i:i + 3], 0.5) for i in range(len(padded) - 2))
+    preview = item.get("content_preview") or ""
+    features.extend(("p:" + word, 0.3) for word in _WORD_RE.findall(preview.lower())[:PREVIEW_WORDS])
+    return features
+
+
+def embed(file_list: list[dict]) -> Any:
+    """Hashed n-gram vectors for file_list, one L2-normalized row per file (numpy float32 array)."""
+    np = require_numpy()
+    vectors = np.zeros((len(file_list), VECTOR_DIM), dtype=np.float32)
+    for row, item in enumerate(file_list):
+        for feature, weight in _features(item):
+            vectors[row, zlib.crc32(feature.encode("utf-8")) % VECTOR_DIM] += weight
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def kmeans(vectors: Any, k: int, iterations: int = KMEANS_ITERATIONS, seed: int = 0) -> tuple[Any, Any]:
+    """
+    Spherical k-means on normalized rows. Returns (labels, centers). Similarities are computed
+    KMEANS_CHUNK rows at a time; a cluster that empties keeps its previous center.
+    """
+    np = require_numpy()
+    n = len(vectors)
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    centers = vectors[rng.choice(n, size=k, replace=False)].copy()
+    labels = np.full(n, -1, dtype=np.int64)
+    for _ in range(iterations):
+        new_labels = np.concatenate(
+            [(vectors[i:i + KMEANS_CHUNK] @ centers.T).argmax(axis=1) for i in range(0, n, KMEANS_CHUNK)]
+        )
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        filled = norms[:, 0] > 0
+        centers[filled] = sums[filled] / norms[filled]
+    return labels, centers
+
+
+def cluster_files(file_list: list[dict], cluster_size: int = DEFAULT_CLUSTER_SIZE) -> list[list[int]]:
+    """
+    Group similar files. Returns clusters as lists of indexes into file_list, each ordered by
+    closeness to the cluster center (most typical file first).
+    """
+    if not file_list:
+        return []
+    np = require_numpy()
+    vectors = embed(file_list)
+    labels, centers = kmeans(vectors, math.ceil(len(file_list) / max(1, cluster_size)))
+    similarity = (vectors * centers[labels]).sum(axis=1)
+    clusters = []
+    for label in range(len(centers)):
+        members = np.flatnonzero(labels == label)
+        if len(members):
+            clusters.append([int(i) for i in members[np.argsort(-similarity[members], kind="stable")]])
+    return clusters
+
+
+def get_cluster_moves(
+    file_list: list[dict],
+    ask: Callable[[list[dict]], list[tuple[str, str]]],
+    cluster_size: int = DEFAULT_CLUSTER_SIZE,
+    representatives: int = REPRESENTATIVES,
+) -> list[tuple[str, str]]:
+    """
+    Cluster file_list, call ask() once with the representatives of every cluster (e.g. get_moves),
+    and give each file its cluster's most common suggested folder. Representatives keep their own
+    suggestion. Returns (relative_path, target_folder) in file_list order.
+    """
+    clusters = cluster_files(file_list, cluster_size)
+    sample = [file_list[i] for members in clusters for i in members[:representatives]]
+    suggested = dict(ask(sample))
+
+    targets: dict[int, str] = {}
+    for members in clusters:
+        votes = Counter(
+            suggested[file_list[i]["path"]] for i in members[:representatives] if file_list[i]["path"] in suggested
+        )
+        if not votes:
+            continue
+        folder = votes.most_common(1)[0][0]
+        for i in members:
+            targets[i] = suggested.get(file_list[i]["path"], folder)
+    return [(file_list[i]["path"], targets[i]) for i in sorted(targets)]
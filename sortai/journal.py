@@ -0,0 +1,157 @@
+"""Append-only journal of an apply run, so an interrupted run can be resumed or undone."""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, NamedTuple, Optional
+
+from sortai.cache import cache_dir
+
+# Completed moves between fsync calls; every record still reaches the OS as soon as it is written.
+FSYNC_EVERY = 256
+
+
+class JournalRun(NamedTuple):
+    """The last apply run recorded in a journal."""
+
+    moves: list[tuple[str, str]]  # planned (relative_path, target_folder)
+    done: list[tuple[str, str]]  # completed (relative_path, new_relative_path), in order
+    finished: bool
+    undone: bool
+
+
+class Journal:
+    """
+    One JSON-lines journal per root under ~/.cache/sortai/journal. Starting a run replaces the
+    previous one; records are then appended (plan, one line per completed move, end).
+    """
+
+    def __init__(self, root: Path, path: Optional[Path] = None) -> None:
+        self.root = root.resolve()
+        digest = hashlib.sha256(str(self.root).encode("utf-8")).hexdigest()[:16]
+        self.path = path or cache_dir() / "journal" / f"{digest}.jsonl"
+        self._file = None
+        self._unsynced = 0
+
+    def _write(self, record: dict) -> None:
+        self._file.write(json.dumps(record) + "\n")
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def begin(self, moves: list[tuple[str, str]]) -> None:
+        """Start a new run with its planned moves."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8", buffering=1)
+        self._write({"op": "plan", "root": str(self.root), "time": time.time(), "moves": moves})
+        self._sync()
+
+    def reopen(self) -> None:
+        """Continue appending to the existing run (used by resume)."""
+        self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def record(self, rel_path: str, new_rel_path: str) -> None:
+        """Record one completed move."""
+        self._write({"op": "done", "src": rel_path, "dest": new_rel_path})
+        self._unsynced += 1
+        if self._unsynced >= FSYNC_EVERY:
+            self._sync()
+
+    def finish(self) -> None:
+        """Mark the run as complete."""
+        self._write({"op": "end"})
+        self._sync()
+
+    def mark_undone(self) -> None:
+        """Mark the run as reversed so it is not undone twice."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "undone"}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def load(self) -> Optional[JournalRun]:
+        """
+        Read the last run, or None if there is no journal. A truncated last line is ignored.
+        Moves completed after an "undone" marker start a new segment that can be undone again.
+        """
+        moves: list[tuple[str, str]] = []
+        done: list[tuple[str, str]] = []
+        finished = undone = False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    op = record.get("op")
+                    if op == "plan":
+                        moves = [(p, t) for p, t in record.get("moves", [])]
+                    elif op == "done":
+                        if undone:
+                            done, undone = [], False
+                        done.append((record["src"], record["dest"]))
+                    elif op == "end":
+                        finished = True
+                    elif op == "undone":
+                        undone = True
+        except OSError:
+            return None
+        return JournalRun(moves, done, finished, undone)
+
+
+def remaining_moves(run: JournalRun) -> list[tuple[str, str]]:
+    """Planned moves of run that were not completed."""
+    completed = {src for src, _ in run.done}
+    return [(path, target) for path, target in run.moves if path not in completed]
+
+
+def undo_moves(root: Path, run: JournalRun, echo: Callable[[str], None]) -> int:
+    """
+    Move every completed file of run back to where it was, newest first, and remove folders
+    left empty. Skips files whose original location is taken again. Returns the number restored.
+    """
+    root = root.resolve()
+    restored = 0
+    folders = set()
+    for src, dest in reversed(run.done):
+        if src == dest:
+            continue
+        current = root / dest
+        original = root / src
+        if not current.is_file():
+            echo(f"  Skip (missing): {dest}")
+            continue
+        if original.exists():
+            echo(f"  Skip (original location taken): {dest} -> {src}")
+            continue
+        try:
+            original.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(current), str(original))
+        except OSError as e:
+            echo(f"  Error restoring {dest}: {e}")
+            continue
+        echo(f"  Restored: {dest} -> {src}")
+        restored += 1
+        folders.add(current.parent)
+
+    # Remove now-empty folders, deepest first, without climbing above root.
+    for folder in sorted(folders, key=lambda p: len(p.parts), reverse=True):
+        while folder != root and root in folder.parents:
+            try:
+                folder.rmdir()
+            except OSError:
+                break
+            folder = folder.parent
+    return restored
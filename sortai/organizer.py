@@ -1,21 +1,57 @@
 """Dry-run display, confirmation prompt, and file move execution."""
 
+import errno
 import os
 import shutil
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Iterable, Optional
 
+from sortai.journal import Journal
+from sortai.profiling import get_profiler
+from sortai.tree import PlanTree, is_inside, safe_source, safe_target
 
-def dry_run(root: Path, moves: list[tuple[str, str]], echo: Callable[[str], None]) -> None:
-    """Print what would be moved where. No filesystem changes."""
+# Threads used for moves that have to copy across filesystems.
+COPY_WORKERS = 4
+
+
+def dry_run(
+    root: Path,
+    moves: Iterable[tuple[str, str]],
+    echo: Callable[[str], None],
+    tree: bool = False,
+    limit: int = 0,
+    depth: Optional[int] = None,
+) -> list[tuple[str, str]]:
+    """
+    Print what would be moved where. No filesystem changes. moves may be a generator (e.g. from
+    iter_moves); each move is printed as it arrives. With tree, a folder tree with file counts
+    is printed once all moves are known, listing up to `limit` files per folder. Moves whose
+    target is unsafe (absolute or containing "..") are reported and dropped, and targets deeper
+    than depth are cut short. Returns the moves shown, with normalized targets.
+    """
     root = root.resolve()
-    echo("Dry run – would move:")
-    for rel_path, target_folder in moves:
-        if target_folder == ".":
-            dest_desc = "(keep at root)"
+    with get_profiler().stage("dry_run") as span:
+        if tree:
+            plan = PlanTree.from_moves(moves, depth)
+            shown = plan.moves
+            for rel_path, target_folder in plan.rejected:
+                echo(f"  Skip (unsafe target): {rel_path} -> {target_folder}")
+            echo(f"Dry run – would move {plan.summary()}:")
+            for line in plan.render(limit):
+                echo(line)
         else:
-            dest_desc = f"{target_folder}/"
-        echo(f"  {rel_path}  ->  {dest_desc}")
+            shown = []
+            echo("Dry run – would move:")
+            for rel_path, target_folder in moves:
+                target = safe_target(target_folder, depth)
+                if target is None:
+                    echo(f"  Skip (unsafe target): {rel_path} -> {target_folder}")
+                    continue
+                dest_desc = "(keep at root)" if target == "." else f"{target}/"
+                echo(f"  {rel_path}  ->  {dest_desc}")
+                shown.append((rel_path, target))
+        span["moves"] = len(shown)
+    return shown
 
 
 def confirm(echo: Callable[[str], None]) -> bool:
@@ -27,27 +63,120 @@ def confirm(echo: Callable[[str], None]) -> bool:
     return answer in ("y", "yes")
 
 
-def apply_moves(root: Path, moves: list[tuple[str, str]], echo: Callable[[str], None]) -> None:
+def apply_moves(
+    root: Path,
+    moves: list[tuple[str, str]],
+    echo: Callable[[str], None],
+    jobs: int = COPY_WORKERS,
+    journal: Optional[Journal] = None,
+    on_skip: Optional[Callable[[str, str, str], None]] = None,
+    on_error: Optional[Callable[[str, str, str], None]] = None,
+) -> list[tuple[str, str]]:
     """
     Create target dirs and move files. Skips and warns if destination file already exists
-    (no overwrite without user consent).
+    (no overwrite without user consent). Returns (relative_path, new_relative_path) for each file moved.
+    Each target directory is created once; files are renamed in place, and only moves that cross
+    a filesystem boundary are copied (on up to `jobs` threads) and then deleted. Moves whose
+    source or target is outside root (absolute, "..", or through a symlink) are skipped.
+    If journal is given, each completed move is recorded in it. Besides the message passed to echo,
+    each skipped move is passed to on_skip(relative_path, target_folder, reason) and each failed
+    one to on_error(relative_path, target_folder, error_message).
     """
-    root = root.resolve()
+    with get_profiler().stage("apply_moves", moves=len(moves)):
+        moved = _apply_moves(root, moves, echo, jobs, journal, on_skip, on_error)
+    get_profiler().count("files_moved", len(moved))
+    return moved
+
+
+def _apply_moves(
+    root: Path,
+    moves: list[tuple[str, str]],
+    echo: Callable[[str], None],
+    jobs: int,
+    journal: Optional[Journal],
+    on_skip: Optional[Callable[[str, str, str], None]],
+    on_error: Optional[Callable[[str, str, str], None]],
+) -> list[tuple[str, str]]:
+    def skip(rel_path: str, target_folder: str, reason: str, shown: str) -> None:
+        echo(f"  Skip ({reason}): {shown}")
+        if on_skip is not None:
+            on_skip(rel_path, target_folder, reason)
+
+    def error(rel_path: str, target_folder: str, e: OSError) -> None:
+        echo(f"  Error moving {rel_path}: {e}")
+        if on_error is not None:
+            on_error(rel_path, target_folder, str(e))
+
+    root_str = str(root.resolve())
+    made_dirs: set[str] = set()
+    inside: dict[str, bool] = {}  # directory -> is_inside(root, directory), resolved once per directory
+    claimed: set[str] = set()  # destinations taken earlier in this plan
+
+    def is_inside_root(directory: str) -> bool:
+        result = inside.get(directory)
+        if result is None:
+            result = inside[directory] = is_inside(root_str, directory)
+        return result
+
+    moved = []
+    cross_device = []  # (rel_path, target_folder, src, dest)
     for rel_path, target_folder in moves:
-        src = root / rel_path.replace("/", os.sep)
-        if not src.is_file():
-            echo(f"  Skip (not a file): {rel_path}")
+        src = os.path.join(root_str, rel_path.replace("/", os.sep))
+        if safe_source(rel_path) is None or not is_inside_root(os.path.dirname(src)):
+            skip(rel_path, target_folder, "unsafe source", rel_path)
+            continue
+        if not os.path.isfile(src):
+            skip(rel_path, target_folder, "not a file", rel_path)
             continue
         if target_folder == ".":
             continue
-        target_dir = root / target_folder.replace("/", os.sep)
-        target_dir.mkdir(parents=True, exist_ok=True)
-        dest = target_dir / src.name
-        if dest.exists() and dest.resolve() != src.resolve():
-            echo(f"  Skip (destination exists): {rel_path} -> {dest.relative_to(root)}")
+        if safe_target(target_folder) is None:
+            skip(rel_path, target_folder, "unsafe target", f"{rel_path} -> {target_folder}")
+            continue
+        target_dir = os.path.join(root_str, target_folder.replace("/", os.sep))
+        if target_dir not in made_dirs and not is_inside_root(target_dir):
+            skip(rel_path, target_folder, "unsafe target", f"{rel_path} -> {target_folder}")
             continue
+        if target_dir not in made_dirs:
+            try:
+                os.makedirs(target_dir, exist_ok=True)
+            except OSError as e:
+                error(rel_path, target_folder, e)
+                continue
+            made_dirs.add(target_dir)
+        name = os.path.basename(src)
+        dest = os.path.join(target_dir, name)
+        if dest in claimed or (os.path.lexists(dest) and os.path.realpath(dest) != os.path.realpath(src)):
+            skip(rel_path, target_folder, "destination exists", f"{rel_path} -> {target_folder}/{name}")
+            continue
+        claimed.add(dest)
         try:
-            shutil.move(str(src), str(dest))
-            echo(f"  Moved: {rel_path} -> {target_folder}/")
+            os.rename(src, dest)
         except OSError as e:
-            echo(f"  Error moving {rel_path}: {e}")
+            if e.errno == errno.EXDEV:
+                cross_device.append((rel_path, target_folder, src, dest))
+            else:
+                error(rel_path, target_folder, e)
+            continue
+        echo(f"  Moved: {rel_path} -> {target_folder}/")
+        moved.append((rel_path, f"{target_folder}/{name}"))
+        if journal is not None:
+            journal.record(*moved[-1])
+
+    if cross_device:
+        get_profiler().count("cross_device_moves", len(cross_device))
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            futures = [pool.submit(shutil.move, src, dest) for _, _, src, dest in cross_device]
+            for (rel_path, target_folder, src, _), future in zip(cross_device, futures):
+                try:
+                    future.result()
+                except OSError as e:
+                    error(rel_path, target_folder, e)
+                    continue
+                echo(f"  Moved: {rel_path} -> {target_folder}/")
+                moved.append((rel_path, f"{target_folder}/{os.path.basename(src)}"))
+                if journal is not None:
+                    journal.record(*moved[-1])
+    return moved
@@ -0,0 +1,92 @@
+"""Save and load move plans, so classification and application can run on different machines."""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from sortai.tree import safe_source
+
+PLAN_VERSION = 1
+
+
+class PlannedMove(NamedTuple):
+    """One move with the (size, mtime_ns) the source file had when the plan was made."""
+
+    path: str
+    target_folder: str
+    size: int
+    mtime_ns: int
+
+
+class Plan(NamedTuple):
+    root: str
+    depth: int
+    moves: list[PlannedMove]
+
+
+def save_plan(plan_path: Path, root: Path, moves: list[tuple[str, str]], depth: int) -> None:
+    """Write moves with a stat fingerprint of each source file. Files that cannot be stat'ed are left out."""
+    root = root.resolve()
+    rows = []
+    for rel_path, target_folder in moves:
+        try:
+            st = os.stat(os.path.join(root, rel_path.replace("/", os.sep)))
+        except OSError:
+            continue
+        rows.append([rel_path, target_folder, st.st_size, st.st_mtime_ns])
+    data = {
+        "version": PLAN_VERSION,
+        "root": str(root),
+        "depth": depth,
+        "created": time.time(),
+        "moves": rows,
+    }
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.write("\n")
+
+
+def load_plan(plan_path: Path) -> Plan:
+    """
+    Read a plan written by save_plan. Raises ValueError if the file is unreadable or malformed, or
+    if a source path is absolute or leaves the root with "..".
+    """
+    try:
+        with open(plan_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Could not read plan {plan_path}: {e}") from e
+    if not isinstance(data, dict) or data.get("version") != PLAN_VERSION:
+        raise ValueError(f"{plan_path} is not a sortai plan (version {PLAN_VERSION}).")
+    try:
+        moves = [PlannedMove(str(p), str(t), int(size), int(mtime)) for p, t, size, mtime in data["moves"]]
+        plan = Plan(str(data["root"]), int(data["depth"]), moves)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed plan {plan_path}: {e}") from e
+    for move in moves:
+        if safe_source(move.path) is None:
+            raise ValueError(f"Unsafe path in plan {plan_path}: {move.path}")
+    return plan
+
+
+def check_plan(root: Path, plan: Plan) -> tuple[list[tuple[str, str]], list[str]]:
+    """
+    Compare each planned source file with its fingerprint. Returns (moves, stale): moves whose
+    file is unchanged, and paths that changed or disappeared since the plan was made.
+    """
+    root = root.resolve()
+    moves = []
+    stale = []
+    for move in plan.moves:
+        try:
+            st = os.stat(os.path.join(root, move.path.replace("/", os.sep)))
+        except OSError:
+            stale.append(move.path)
+            continue
+        if (st.st_size, st.st_mtime_ns) != (move.size, move.mtime_ns):
+            stale.append(move.path)
+            continue
+        moves.append((move.path, move.target_folder))
+    return moves, stale
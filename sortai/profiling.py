@@ -0,0 +1,121 @@
+"""Per-stage timing and counters for --profile, with summary-table and Chrome-trace output."""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, NamedTuple, Optional
+
+
+class Span(NamedTuple):
+    name: str
+    start: float  # seconds since the profiler started
+    duration: float
+    thread: int
+    args: dict
+
+
+class Profiler:
+    """Collects timed spans and named counters. Safe to use from worker threads."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self.counters: dict[str, float] = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str, **args) -> Iterator[dict]:
+        """Time the block as one span. The yielded dict can be filled with extra span arguments."""
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            span = Span(name, start - self._origin, end - start, threading.get_ident(), args)
+            with self._lock:
+                self.spans.append(span)
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Add value to counter name."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> list[tuple[str, int, float]]:
+        """(stage, calls, total seconds) per stage name, in order of first appearance."""
+        totals: dict[str, list] = {}
+        for span in sorted(self.spans, key=lambda s: s.start):
+            entry = totals.setdefault(span.name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += span.duration
+        return [(name, calls, seconds) for name, (calls, seconds) in totals.items()]
+
+    def report(self, echo: Callable[[str], None]) -> None:
+        """Print a summary table of stages and counters."""
+        rows = self.summary()
+        width = max([len(name) for name, _, _ in rows] + [len(name) for name in self.counters] + [5])
+        echo("Profile:")
+        echo(f"  {'stage':<{width}}  {'calls':>6}  {'seconds':>9}")
+        for name, calls, seconds in rows:
+            echo(f"  {name:<{width}}  {calls:>6}  {seconds:>9.3f}")
+        if self.counters:
+            echo("")
+            for name, value in sorted(self.counters.items()):
+                shown = f"{value:.3f}" if isinstance(value, float) and not value.is_integer() else f"{int(value)}"
+                echo(f"  {name:<{width}}  {shown:>17}")
+
+    def chrome_trace(self) -> dict:
+        """Spans as a Chrome trace (chrome://tracing, Perfetto); counters go in the metadata."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": span.name,
+                "ph": "X",
+                "ts": round(span.start * 1e6),
+                "dur": round(span.duration * 1e6),
+                "pid": pid,
+                "tid": span.thread,
+                "args": span.args,
+            }
+            for span in self.spans
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"counters": self.counters}}
+
+    def write_trace(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+class _NullProfiler:
+    """Stand-in used when profiling is off; every hook is a no-op."""
+
+    @contextmanager
+    def stage(self, name: str, **args) -> Iterator[dict]:
+        yield args
+
+    def count(self, name: str, value: float = 1) -> None:
+        pass
+
+
+_NULL = _NullProfiler()
+_active: Optional[Profiler] = None
+
+
+def get_profiler():
+    """Return the active Profiler, or a no-op stand-in if profiling is off."""
+    return _active or _NULL
+
+
+def start_profiling() -> Profiler:
+    """Start collecting into a new Profiler and return it."""
+    global _active
+    _active = Profiler()
+    return _active
+
+
+def stop_profiling() -> Optional[Profiler]:
+    """Stop collecting and return the profiler that was active, if any."""
+    global _active
+    profiler, _active = _active, None
+    return profiler
@@ -1,14 +1,36 @@
 """File listing and content extraction (first ~500 chars) for text-based types."""
 
+import hashlib
 import os
+import stat
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+from sortai.cache import PreviewCache
+from sortai.profiling import get_profiler
 
 CONTENT_PREVIEW_LENGTH = 500
 
 # Extensions for which we read file content; everything else is categorized by filename/extension only.
 CONTENT_EXTENSIONS = {".pdf", ".txt", ".md", ".docx", ".csv"}
 
+# DOCX previews read at most this many bytes of word/document.xml, in chunks of DOCX_CHUNK_SIZE.
+DOCX_XML_BUDGET = 4 << 20
+DOCX_CHUNK_SIZE = 64 << 10
+
+# PDF previews skip a first page whose content streams are larger than this many bytes.
+PDF_CONTENT_BUDGET = 4 << 20
+
+# CPU-bound parsers; with jobs > 1 these run in worker processes, plain-text reads in threads.
+PROCESS_EXTENSIONS = {".pdf", ".docx"}
+
+# Duplicate detection reads files in chunks of this size; candidates are first compared on the first chunk only.
+HASH_CHUNK_SIZE = 1 << 20
+
+# Seconds to wait for a single preview when extracting in parallel before giving up on it.
+PREVIEW_TIMEOUT = 30.0
+
 
 def _read_text_preview(path: Path, limit: int = CONTENT_PREVIEW_LENGTH) -> Optional[str]:
     """Read first `limit` characters from a text file. Returns None on error."""
@@ -20,13 +42,29 @@ def _read_text_preview(path: Path, limit: int = CONTENT_PREVIEW_LENGTH) -> Optio
 
 
 def _read_pdf_preview(path: Path, limit: int = CONTENT_PREVIEW_LENGTH) -> Optional[str]:
-    """Extract text from first page of PDF and truncate. Returns None on error."""
+    """
+    Extract text from first page of PDF and truncate. Returns None on error.
+    The page tree is walked only up to page 1, whose content streams are read only if they total
+    at most PDF_CONTENT_BUDGET bytes; text is taken in stream order without layout analysis.
+    """
     try:
         import pdfplumber
-        with pdfplumber.open(path) as pdf:
-            if not pdf.pages:
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdftypes import resolve1
+        from pdfplumber.page import Page
+
+        with open(path, "rb") as f:
+            # pdf.pages (also used by pdf.close()) would walk the whole page tree; create_pages is lazy.
+            pdf = pdfplumber.PDF(f, stream_is_external=True)
+            first = next(PDFPage.create_pages(pdf.doc), None)
+            if first is None:
                 return None
-            text = pdf.pages[0].extract_text()
+            streams = [resolve1(ref) for ref in first.contents]
+            if sum(len(getattr(stream, "rawdata", None) or b"") for stream in streams) > PDF_CONTENT_BUDGET:
+                return None
+            page = Page(pdf, first, page_number=1)
+            extract = getattr(page, "extract_text_simple", page.extract_text)
+            text = extract()
             if not text:
                 return None
             return (text[: limit + 1])[:limit]
@@ -34,19 +72,54 @@ def _read_pdf_preview(path: Path, limit: int = CONTENT_PREVIEW_LENGTH) -> Option
         return None
 
 
+def _local_name(tag: str) -> str:
+    """XML tag without its namespace ('{ns}t' -> 't')."""
+    return tag.rsplit("}", 1)[-1]
+
+
 def _read_docx_preview(path: Path, limit: int = CONTENT_PREVIEW_LENGTH) -> Optional[str]:
-    """Extract paragraph text from docx and truncate. Returns None on error."""
+    """
+    Extract paragraph text from docx and truncate. Returns None on error.
+    Streams word/document.xml out of the zip and stops once `limit` characters or
+    DOCX_XML_BUDGET bytes of XML have been read, so cost does not grow with document size.
+    """
+    import zipfile
+    from xml.etree import ElementTree
+
     try:
-        from docx import Document
-        doc = Document(path)
-        parts = []
-        n = 0
-        for para in doc.paragraphs:
-            if para.text:
-                parts.append(para.text)
-                n += len(para.text)
-                if n >= limit:
+        with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as xml:
+            parser = ElementTree.XMLPullParser(events=("end",))
+            parts: list[str] = []
+            run: list[str] = []
+            n = 0
+            read = 0
+            while n < limit and read < DOCX_XML_BUDGET:
+                chunk = xml.read(DOCX_CHUNK_SIZE)
+                if not chunk:
                     break
+                read += len(chunk)
+                parser.feed(chunk)
+                for _, elem in parser.read_events():
+                    name = _local_name(elem.tag)
+                    if name == "r":
+                        # Only tabs inside a run are text; w:pPr also has w:tabs/w:tab tab stops.
+                        for child in elem:
+                            child_name = _local_name(child.tag)
+                            if child_name == "t":
+                                run.append(child.text or "")
+                            elif child_name == "tab":
+                                run.append("\t")
+                            elif child_name in ("br", "cr"):
+                                run.append("\n")
+                    elif name == "p":
+                        text = "".join(run)
+                        run = []
+                        elem.clear()
+                        if text:
+                            parts.append(text)
+                            n += len(text)
+                            if n >= limit:
+                                break
         text = " ".join(parts)
         return (text[: limit + 1])[:limit] if text else None
     except Exception:
@@ -65,37 +138,345 @@ def get_content_preview(path: Path, limit: int = CONTENT_PREVIEW_LENGTH) -> Opti
     return None
 
 
+class ScanEntry(NamedTuple):
+    """One file found by iter_files. path is relative to the scan root, with forward slashes."""
+
+    path: str
+    name: str
+    full_path: str
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+def iter_files(root: Path, max_depth: Optional[int] = None) -> Iterator[ScanEntry]:
+    """
+    Yield files under root up to max_depth levels of subfolders, in the same order as os.walk.
+    Uses os.scandir so stat data comes from the directory entry; symlinked directories are not followed.
+    Only regular files (or symlinks to them) are yielded.
+    """
+    root = root.resolve()
+    stack = [(str(root), "", 0)]  # (directory, relative prefix, depth)
+    while stack:
+        dirpath, prefix, depth = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if not entry.is_symlink() and (max_depth is None or depth < max_depth):
+                            subdirs.append((entry.path, prefix + entry.name + "/", depth + 1))
+                        continue
+                    try:
+                        is_file = entry.is_file()
+                    except OSError:
+                        is_file = False
+                    if not is_file:
+                        # FIFOs, sockets and devices: reading one could block forever.
+                        continue
+                    try:
+                        st = entry.stat()
+                        size, mtime_ns, inode = st.st_size, st.st_mtime_ns, st.st_ino
+                    except OSError:
+                        size, mtime_ns, inode = -1, 0, 0
+                    yield ScanEntry(prefix + entry.name, entry.name, entry.path, size, mtime_ns, inode)
+        except OSError:
+            continue
+        stack.extend(reversed(subdirs))
+
+
+class _ThreadTask:
+    """One preview read by a _DaemonThreads worker. get() works like multiprocessing's AsyncResult.get."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.value: Optional[str] = None
+        self.error: Optional[Exception] = None
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        try:
+            self.value = get_content_preview(self.path)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[str]:
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Reading {self.path} timed out")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class _DaemonThreads:
+    """
+    Reads previews on daemon threads. ThreadPoolExecutor joins its workers at interpreter exit,
+    so a read stuck on a hung network file would keep the process alive; a daemon thread does not.
+    """
+
+    def __init__(self, workers: int) -> None:
+        import queue
+
+        self._queue: Any = queue.SimpleQueue()
+        self._workers = workers
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def submit(self, path: Path) -> _ThreadTask:
+        task = _ThreadTask(path)
+        self._queue.put(task)
+        return task
+
+    def _work(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            task.run()
+
+    def close(self) -> None:
+        """Let idle workers exit; one stuck in a read is left behind."""
+        for _ in range(self._workers):
+            self._queue.put(None)
+
+
+class _PreviewPool:
+    """
+    Extracts previews as files are submitted. With jobs > 1, PDF/DOCX go to worker processes
+    and plain text to daemon threads; results() returns previews in submission order.
+    """
+
+    def __init__(self, jobs: int, timeout: Optional[float]) -> None:
+        self.jobs = jobs
+        self.timeout = timeout
+        self._threads: Optional[_DaemonThreads] = None  # created on first use
+        self._processes: Any = None  # multiprocessing.Pool, created on first use
+        self._pending: list = []  # previews (jobs == 1), _ThreadTasks or AsyncResults
+        self.failed: set[int] = set()  # indexes of previews that timed out or raised, set by results()
+
+    def submit(self, path: Path) -> None:
+        if self.jobs <= 1:
+            self._pending.append(get_content_preview(path))
+            return
+        if path.suffix.lower() in PROCESS_EXTENSIONS:
+            if self._processes is None:
+                import multiprocessing
+
+                self._processes = multiprocessing.Pool(processes=self.jobs)
+            self._pending.append(self._processes.apply_async(get_content_preview, (path,)))
+        else:
+            if self._threads is None:
+                self._threads = _DaemonThreads(self.jobs)
+            self._pending.append(self._threads.submit(path))
+
+    def results(self) -> list[Optional[str]]:
+        """Wait for all previews. One that fails or exceeds the timeout is None, and its index goes in failed."""
+        if self.jobs <= 1:
+            return self._pending
+        from multiprocessing import TimeoutError as PoolTimeoutError
+
+        results: list[Optional[str]] = []
+        abandoned = False
+        try:
+            for index, pending in enumerate(self._pending):
+                try:
+                    results.append(pending.get(self.timeout))
+                    continue
+                except (TimeoutError, PoolTimeoutError):
+                    abandoned = True
+                except Exception:
+                    pass
+                results.append(None)
+                self.failed.add(index)
+        finally:
+            self.close(abandoned)
+        return results
+
+    def close(self, abandoned: bool = False) -> None:
+        """Shut pools down without waiting for a timed-out file; terminate worker processes stuck on one."""
+        if self._threads is not None:
+            self._threads.close()
+            self._threads = None
+        if self._processes is not None:
+            if abandoned:
+                self._processes.terminate()
+            else:
+                self._processes.close()
+            self._processes.join()
+            self._processes = None
+
+
+def _file_digest(path: str, max_bytes: Optional[int] = None) -> Optional[bytes]:
+    """BLAKE2b digest of a file (or its first max_bytes), read in chunks. Returns None on error."""
+    h = hashlib.blake2b(digest_size=16)
+    remaining = max_bytes
+    try:
+        with open(path, "rb") as f:
+            while remaining is None or remaining > 0:
+                chunk = f.read(HASH_CHUNK_SIZE if remaining is None else min(HASH_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                h.update(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+    except OSError:
+        return None
+    return h.digest()
+
+
+def _group_by(entries: list[ScanEntry], key) -> list[list[ScanEntry]]:
+    """Group entries by key(entry), keeping groups of two or more; entries with a None key are dropped."""
+    groups: dict = {}
+    for entry in entries:
+        k = key(entry)
+        if k is not None:
+            groups.setdefault(k, []).append(entry)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def find_duplicates(entries: list[ScanEntry]) -> dict[str, list[str]]:
+    """
+    Find byte-identical files. Candidates are grouped by size, then by a hash of their first chunk,
+    then by a full hash. Returns {representative path: [duplicate paths]}, where the representative
+    is the first file of the group in scan order. Empty files are never grouped.
+    """
+    duplicates: dict[str, list[str]] = {}
+    for same_size in _group_by(entries, lambda e: e.size if e.size > 0 else None):
+        for same_head in _group_by(same_size, lambda e: _file_digest(e.full_path, HASH_CHUNK_SIZE)):
+            if same_head[0].size > HASH_CHUNK_SIZE:
+                groups = _group_by(same_head, lambda e: _file_digest(e.full_path))
+            else:
+                groups = [same_head]
+            for group in groups:
+                duplicates[group[0].path] = [e.path for e in group[1:]]
+    return duplicates
+
+
+def expand_duplicates(moves: list[tuple[str, str]], file_list: list[dict]) -> list[tuple[str, str]]:
+    """Give every duplicate of a moved file (see list_files(dedupe=True)) the same target folder."""
+    duplicates = {item["path"]: item["duplicates"] for item in file_list if item.get("duplicates")}
+    if not duplicates:
+        return moves
+    result = []
+    for path, target in moves:
+        result.append((path, target))
+        result.extend((dup, target) for dup in duplicates.get(path, ()))
+    return result
+
+
+def _describe(
+    entries: Iterable[ScanEntry],
+    jobs: int,
+    timeout: Optional[float],
+    cache: Optional[PreviewCache],
+) -> list[dict]:
+    """
+    Build list_files-style dicts for entries, extracting previews as entries arrive. Previews that
+    failed are not cached; if the cache itself fails (e.g. locked too long), the scan goes on without it.
+    """
+    if cache is not None:
+        # Already loaded by the cache.
+        import sqlite3
+    profiler = get_profiler()
+    result = []
+    pending: list[tuple[int, ScanEntry]] = []  # (index into result, file to preview)
+    pool = _PreviewPool(jobs, timeout)
+    try:
+        for entry in entries:
+            result.append({
+                "path": entry.path,
+                "name": entry.name,
+                "content_preview": None,
+            })
+            if os.path.splitext(entry.name)[1].lower() not in CONTENT_EXTENSIONS:
+                continue
+            full_path = Path(entry.full_path)
+            if cache is not None:
+                try:
+                    hit, content = cache.get(full_path, (entry.size, entry.mtime_ns, entry.inode))
+                except sqlite3.Error:
+                    cache, hit = None, False
+                if hit:
+                    result[-1]["content_preview"] = content
+                    profiler.count("preview_cache_hits")
+                    continue
+            pending.append((len(result) - 1, entry))
+            pool.submit(full_path)
+        previews = pool.results()
+    finally:
+        pool.close()
+
+    for i, ((index, entry), content) in enumerate(zip(pending, previews)):
+        result[index]["content_preview"] = content
+        if cache is not None and entry.size >= 0 and i not in pool.failed:
+            cache.put(Path(entry.full_path), (entry.size, entry.mtime_ns, entry.inode), content)
+    profiler.count("files_scanned", len(result))
+    profiler.count("previews_extracted", len(pending))
+    profiler.count("preview_bytes_on_disk", sum(max(entry.size, 0) for _, entry in pending))
+    profiler.count("preview_chars", sum(len(content or "") for content in previews))
+    return result
+
+
 def list_files(
     root: Path,
     max_depth: Optional[int] = None,
+    jobs: int = 1,
+    timeout: Optional[float] = PREVIEW_TIMEOUT,
+    cache: Optional[PreviewCache] = None,
+    dedupe: bool = False,
 ) -> list[dict]:
     """
     Walk directory up to max_depth levels; return list of dicts with path (relative),
     name (filename), and content_preview (first ~500 chars for supported types, else None).
+    With dedupe, byte-identical files are listed once: the first copy gets a "duplicates" key
+    with the relative paths of the others, which are left out of the list.
+    With jobs > 1, previews are extracted in parallel while the walk is still running
+    (PDF/DOCX in processes, text in threads); each preview then gets at most `timeout` seconds.
+    Output order is the same as with jobs=1.
+    If cache is given, previews of files whose size/mtime/inode are unchanged are reused.
     """
     root = root.resolve()
     if not root.is_dir():
         return []
+    with get_profiler().stage("list_files", jobs=jobs):
+        if not dedupe:
+            return _describe(iter_files(root, max_depth), jobs, timeout, cache)
 
-    result = []
-    for dirpath, dirnames, filenames in os.walk(root):
-        dirpath = Path(dirpath)
-        depth = len(dirpath.relative_to(root).parts) if dirpath != root else 0
-        if max_depth is not None and depth > max_depth:
+        entries = list(iter_files(root, max_depth))
+        with get_profiler().stage("find_duplicates"):
+            duplicates = find_duplicates(entries)
+        skip = {path for paths in duplicates.values() for path in paths}
+        get_profiler().count("duplicates_skipped", len(skip))
+        result = _describe([e for e in entries if e.path not in skip], jobs, timeout, cache)
+        for item in result:
+            if item["path"] in duplicates:
+                item["duplicates"] = duplicates[item["path"]]
+        return result
+
+
+def describe_files(
+    root: Path,
+    paths: list[str],
+    jobs: int = 1,
+    timeout: Optional[float] = PREVIEW_TIMEOUT,
+    cache: Optional[PreviewCache] = None,
+) -> list[dict]:
+    """Like list_files, but only for the given relative paths. Missing and non-regular files are skipped."""
+    root = root.resolve()
+    entries = []
+    for rel in paths:
+        full_path = root / rel
+        try:
+            st = full_path.stat()
+        except OSError:
             continue
-        if max_depth is not None and depth >= max_depth:
-            dirnames[:] = []  # do not descend further
-        for name in filenames:
-            full_path = dirpath / name
-            try:
-                rel = full_path.relative_to(root)
-            except ValueError:
-                continue
-            rel_str = str(rel).replace("\\", "/")
-            content = get_content_preview(full_path) if full_path.suffix.lower() in CONTENT_EXTENSIONS else None
-            result.append({
-                "path": rel_str,
-                "name": name,
-                "content_preview": content,
-            })
-    return result
+        if not stat.S_ISREG(st.st_mode):
+            continue
+        entries.append(ScanEntry(rel, full_path.name, str(full_path), st.st_size, st.st_mtime_ns, st.st_ino))
+    return _describe(entries, jobs, timeout, cache)
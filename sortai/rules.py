@@ -0,0 +1,124 @@
+"""Offline rule-based classification for files whose folder is obvious from name or magic bytes."""
+
+import fnmatch
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+# Folder for extensions that Gemini would only see as "(filename/extension only)" anyway.
+EXTENSION_FOLDERS = {
+    "images": {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tif", ".tiff", ".webp", ".heic", ".svg", ".ico"},
+    "videos": {".mp4", ".mov", ".avi", ".mkv", ".webm", ".wmv", ".m4v", ".flv"},
+    "audio": {".mp3", ".wav", ".flac", ".aac", ".ogg", ".m4a", ".wma", ".opus"},
+    "archives": {".zip", ".tar", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar"},
+    "installers": {".exe", ".msi", ".dmg", ".pkg", ".deb", ".rpm", ".apk", ".appimage"},
+}
+
+# Leading bytes -> folder, used for files without an extension.
+MAGIC_FOLDERS = [
+    (b"\x89PNG\r\n\x1a\n", "images"),
+    (b"\xff\xd8\xff", "images"),
+    (b"GIF87a", "images"),
+    (b"GIF89a", "images"),
+    (b"ID3", "audio"),
+    (b"fLaC", "audio"),
+    (b"OggS", "audio"),
+    (b"\x1f\x8b", "archives"),
+    (b"7z\xbc\xaf\x27\x1c", "archives"),
+    (b"Rar!\x1a\x07", "archives"),
+    (b"MZ", "installers"),
+]
+SNIFF_BYTES = 16
+
+
+def default_rules_path() -> Path:
+    """Return the user rules file ($XDG_CONFIG_HOME/sortai/rules.json or ~/.config/sortai/rules.json)."""
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return Path(base) / "sortai" / "rules.json"
+
+
+def _sniff(path: Path) -> Optional[str]:
+    """Guess a folder from the first bytes of a file. Returns None if unknown or unreadable."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError:
+        return None
+    if head[4:8] == b"ftyp":
+        return "videos"
+    for magic, folder in MAGIC_FOLDERS:
+        if head.startswith(magic):
+            return folder
+    return None
+
+
+class Rules:
+    """
+    Classifies files without calling Gemini. User patterns (glob on the relative path or the
+    filename -> target folder) are checked first, then the built-in extension table, then magic
+    bytes for files with no extension. The built-in rules only apply to files at the root: a file
+    already in a subfolder was put there by the user or an earlier run, so only the model (which
+    sees the folder) or an explicit pattern may move it.
+    """
+
+    def __init__(self, patterns: Optional[dict[str, str]] = None, sniff: bool = True) -> None:
+        self.patterns = list((patterns or {}).items())
+        self.sniff = sniff
+        self._by_extension = {ext: folder for folder, exts in EXTENSION_FOLDERS.items() for ext in exts}
+
+    def classify(self, root: Path, item: dict) -> Optional[str]:
+        """Return the target folder for item, or None if the file needs Gemini."""
+        path = item["path"]
+        name = item.get("name") or path.rsplit("/", 1)[-1]
+        for pattern, folder in self.patterns:
+            if fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern):
+                return folder
+        if "/" in path:
+            return None
+        ext = os.path.splitext(name)[1].lower()
+        if ext:
+            return self._by_extension.get(ext)
+        if self.sniff:
+            return _sniff(root / path)
+        return None
+
+
+def load_rules(path: Optional[Path] = None) -> Rules:
+    """
+    Build Rules from a JSON file of {"pattern": "target/folder"}. With no path, the default
+    rules file is used if it exists. Raises ValueError if the file is not a JSON object of strings.
+    """
+    if path is None:
+        path = default_rules_path()
+        if not path.is_file():
+            return Rules()
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Could not read rules file {path}: {e}") from e
+    if not isinstance(data, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in data.items()):
+        raise ValueError(f"Rules file {path} must be a JSON object mapping patterns to folder names.")
+    return Rules({k: v.strip().strip("/") or "." for k, v in data.items()})
+
+
+def split_by_rules(
+    root: Path,
+    file_list: list[dict],
+    rules: Rules,
+    depth: int,
+) -> tuple[list[tuple[str, str]], list[dict]]:
+    """
+    Classify what the rules can. Returns (moves, remaining): moves for matched files, and the
+    files that still need Gemini. Matches deeper than `depth` folders are left to Gemini.
+    """
+    moves = []
+    remaining = []
+    for item in file_list:
+        folder = rules.classify(root, item)
+        if folder is None or (folder != "." and folder.count("/") + 1 > depth):
+            remaining.append(item)
+        else:
+            moves.append((item["path"], folder))
+    return moves, remaining
@@ -0,0 +1,129 @@
+"""Folder tree of a move plan: validates targets and renders an aggregated dry-run view."""
+
+import os
+import re
+import sys
+from typing import Iterable, Iterator, Optional
+
+_DRIVE_RE = re.compile(r"^[A-Za-z]:")
+
+
+def split_target(target: str, depth: Optional[int] = None) -> Optional[list[str]]:
+    """
+    Path components of a target folder ([] for the root), or None if it is unsafe: absolute,
+    home-relative, or climbing out with "..". Components past `depth` are dropped.
+    """
+    target = target.strip().replace("\\", "/")
+    if target.startswith(("/", "~")) or _DRIVE_RE.match(target) or "\0" in target:
+        return None
+    parts = []
+    for part in target.split("/"):
+        part = part.strip()
+        if part in ("", "."):
+            continue
+        if part == "..":
+            return None
+        parts.append(part)
+    return parts if depth is None else parts[:depth]
+
+
+def safe_target(target: str, depth: Optional[int] = None) -> Optional[str]:
+    """Normalized target folder ("." for the root; see split_target), or None if it is unsafe."""
+    parts = split_target(target, depth)
+    if parts is None:
+        return None
+    return "/".join(parts) or "."
+
+
+def safe_source(rel_path: str) -> Optional[str]:
+    """Normalized relative path of a file to move, or None if it is unsafe (see split_target) or empty."""
+    parts = split_target(rel_path)
+    return "/".join(parts) if parts else None
+
+
+def is_inside(root: str, path: str) -> bool:
+    """True if path, with symlinks resolved, is root or below it. root must already be resolved."""
+    real = os.path.realpath(path)
+    return real == root or real.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class _Node:
+    __slots__ = ("children", "files", "total")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.files: list[str] = []  # files moved into exactly this folder
+        self.total = 0  # files in this folder and below
+
+
+class PlanTree:
+    """
+    Trie of a plan's target folders with interned components, so a plan with many files in few
+    folders stays small. add() validates and normalizes each target in the same pass.
+    """
+
+    def __init__(self, depth: Optional[int] = None) -> None:
+        self.depth = depth
+        self.root = _Node()
+        self.moves: list[tuple[str, str]] = []  # accepted moves, targets normalized
+        self.rejected: list[tuple[str, str]] = []  # moves with unsafe targets
+        self.folders = 0
+
+    @classmethod
+    def from_moves(cls, moves: Iterable[tuple[str, str]], depth: Optional[int] = None) -> "PlanTree":
+        tree = cls(depth)
+        for rel_path, target in moves:
+            tree.add(rel_path, target)
+        return tree
+
+    def add(self, rel_path: str, target: str) -> Optional[str]:
+        """Insert one move. Returns the normalized target, or None if it was rejected."""
+        parts = split_target(target, self.depth)
+        if parts is None:
+            self.rejected.append((rel_path, target))
+            return None
+        node = self.root
+        node.total += 1
+        for part in parts:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[sys.intern(part)] = _Node()
+                self.folders += 1
+            child.total += 1
+            node = child
+        node.files.append(rel_path)
+        folder = "/".join(parts) or "."
+        self.moves.append((rel_path, folder))
+        return folder
+
+    def summary(self) -> str:
+        """E.g. "120 files into 4 folders" (files kept at the root are not counted)."""
+        folders = "1 folder" if self.folders == 1 else f"{self.folders} folders"
+        return f"{_files(len(self.moves) - len(self.root.files))} into {folders}"
+
+    def render(self, limit: int = 0) -> Iterator[str]:
+        """
+        Lines of the tree: each folder with its file count, and up to `limit` of the files moved
+        into it. Files that stay at the root are summarized last.
+        """
+        stack = [(name, node, 1) for name, node in sorted(self.root.children.items(), reverse=True)]
+        while stack:
+            name, node, level = stack.pop()
+            indent = "  " * level
+            yield f"{indent}{name}/  ({_files(node.total)})"
+            yield from _file_lines(node.files, limit, indent + "  ")
+            stack.extend((child, sub, level + 1) for child, sub in sorted(node.children.items(), reverse=True))
+        if self.root.files:
+            yield f"  (keep at root)  ({_files(len(self.root.files))})"
+            yield from _file_lines(self.root.files, limit, "    ")
+
+
+def _files(count: int) -> str:
+    return f"{count} file" if count == 1 else f"{count} files"
+
+
+def _file_lines(files: list[str], limit: int, indent: str) -> Iterator[str]:
+    for rel_path in files[:limit]:
+        yield f"{indent}{rel_path}"
+    if 0 < limit < len(files):
+        yield f"{indent}... and {len(files) - limit} more"
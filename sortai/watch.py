@@ -0,0 +1,192 @@
+"""Watch mode: organize only files that are new or changed since the last pass."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from sortai.cache import cache_dir
+from sortai.reader import iter_files
+
+# Seconds between directory polls when watchdog (inotify/FSEvents) is not installed.
+POLL_INTERVAL = 2.0
+
+# With watchdog, rescan at least this often in case an event was missed.
+RESCAN_INTERVAL = 60.0
+
+# A new or changed file is handled once it has not changed for this many seconds.
+DEBOUNCE = 2.0
+
+# Seconds before files that organize() could not handle (e.g. the model server was down) are retried.
+RETRY_DELAY = 30.0
+
+Snapshot = dict[str, tuple[int, int]]  # relative path -> (size, mtime_ns)
+
+
+def snapshot(root: Path, max_depth: Optional[int] = None) -> Snapshot:
+    """Return the current (size, mtime_ns) of every file under root."""
+    return {entry.path: (entry.size, entry.mtime_ns) for entry in iter_files(root, max_depth)}
+
+
+class WatchState:
+    """
+    Files already seen (organized or deliberately left alone) under one root, persisted as JSON.
+    Dry-run watchers keep their own state, so files they only showed are still organized by a
+    later watcher with --apply.
+    """
+
+    def __init__(self, root: Path, path: Optional[Path] = None, dry_run: bool = False) -> None:
+        self.root = root.resolve()
+        digest = hashlib.sha256(str(self.root).encode("utf-8")).hexdigest()[:16]
+        name = f"{digest}.dry-run.json" if dry_run else f"{digest}.json"
+        self.path = path or cache_dir() / "watch" / name
+        self.seen: Snapshot = {}
+        self.loaded = False
+
+    def load(self) -> None:
+        """Read the state file if there is one."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        self.seen = {p: (fp[0], fp[1]) for p, fp in data.get("seen", {}).items()}
+        self.loaded = True
+
+    def save(self) -> None:
+        """Write the state file atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"root": str(self.root), "seen": self.seen}, f)
+        os.replace(tmp, self.path)
+
+    def delta(self, current: Snapshot) -> list[str]:
+        """Paths in current that are new or changed since they were last seen."""
+        return [p for p, fp in current.items() if self.seen.get(p) != fp]
+
+
+def _start_observer(root: Path, event: threading.Event):
+    """Start a watchdog observer that sets event on any change, or return None if unavailable."""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, _event) -> None:
+            event.set()
+
+    observer = Observer()
+    observer.schedule(_Handler(), str(root), recursive=True)
+    observer.start()
+    return observer
+
+
+def _settled(
+    pending: dict[str, tuple[tuple[int, int], float]],
+    current: Snapshot,
+    delta: list[str],
+    debounce: float,
+    now: float,
+) -> list[str]:
+    """
+    Update pending (path -> (fingerprint, time it counts as unchanged from)) from delta and return
+    the paths whose fingerprint has not changed for `debounce` seconds, removing them from pending.
+    Each path is debounced on its own, so a file that keeps changing does not hold up the others.
+    """
+    changing = set(delta)
+    for p in list(pending):
+        if p not in changing:
+            del pending[p]
+    for p in delta:
+        entry = pending.get(p)
+        if entry is None or entry[0] != current[p]:
+            pending[p] = (current[p], now)
+    ready = [p for p in delta if now - pending[p][1] >= debounce]
+    for p in ready:
+        del pending[p]
+    return ready
+
+
+def watch(
+    root: Path,
+    organize: Callable[[list[str]], tuple[list[str], list[tuple[str, str]]]],
+    echo: Callable[[str], None],
+    max_depth: Optional[int] = None,
+    interval: float = POLL_INTERVAL,
+    debounce: float = DEBOUNCE,
+    dry_run: bool = False,
+) -> None:
+    """
+    Watch root and call organize(new_or_changed_paths) with files that have not changed for
+    `debounce` seconds.
+    organize returns (handled, moved): the paths it dealt with, which are recorded as seen, and
+    (relative_path, new_relative_path) for files it moved, whose destinations are recorded as seen
+    so they are not organized again. Paths it did not handle are retried after RETRY_DELAY seconds.
+    On the first run the current contents are taken as already organized. With dry_run, a
+    separate state is kept (see WatchState). Runs until interrupted.
+    """
+    root = root.resolve()
+    state = WatchState(root, dry_run=dry_run)
+    state.load()
+    if not state.loaded:
+        state.seen = snapshot(root, max_depth)
+        state.save()
+        echo(f"Watching {root} ({len(state.seen)} existing files left as they are).")
+    else:
+        echo(f"Watching {root}.")
+
+    changed = threading.Event()
+    observer = _start_observer(root, changed)
+    pending: dict[str, tuple[tuple[int, int], float]] = {}
+    try:
+        while True:
+            # While files are settling, look again as soon as the next one may be ready.
+            wait = RESCAN_INTERVAL if observer is not None else interval
+            if pending:
+                settle = min(since for _, since in pending.values()) + debounce - time.monotonic()
+                wait = min(wait, max(settle, 0.0))
+            if observer is not None:
+                changed.wait(wait)
+                changed.clear()
+            else:
+                time.sleep(wait)
+
+            current = snapshot(root, max_depth)
+            delta = state.delta(current)
+            if not delta:
+                pending.clear()
+                if len(current) != len(state.seen):
+                    state.seen = {p: fp for p, fp in state.seen.items() if p in current}
+                    state.save()
+                continue
+            ready = _settled(pending, current, delta, debounce, time.monotonic())
+            if not ready:
+                continue
+
+            echo(f"{len(ready)} new or changed file(s).")
+            handled, moved = organize(ready)
+            seen = {p: fp for p, fp in state.seen.items() if p in current}
+            for p in handled:
+                seen[p] = current[p]
+            retry_at = time.monotonic() + RETRY_DELAY
+            for p in set(ready).difference(handled):
+                pending[p] = (current[p], retry_at)
+            for src, dest in moved:
+                seen.pop(src, None)
+                try:
+                    st = (root / dest).stat()
+                except OSError:
+                    continue
+                seen[dest] = (st.st_size, st.st_mtime_ns)
+            state.seen = seen
+            state.save()
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
@@ -0,0 +1,98 @@
+"""Cache of categorized commits under .git/logcraft-cache, so reruns only read new commits."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+from git import Repo
+
+from logcraft.changelog import DEFAULT_CATEGORIZER, Categorizer, CommitEntry, records_to_entries
+from logcraft.git_utils import is_ancestor, iter_log, resolve_commit, resolve_tag
+
+CACHE_NAME = "logcraft-cache"
+CACHE_VERSION = 1
+
+
+def cache_path(repo: Repo) -> Path:
+    return Path(repo.git_dir) / CACHE_NAME
+
+
+def _load(path: Path) -> dict:
+    """Cached ranges keyed by --since tag ("" for the whole history); {} if missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+        return {}
+    ranges = data.get("ranges")
+    return ranges if isinstance(ranges, dict) else {}
+
+
+def _save(path: Path, ranges: dict) -> None:
+    """Write the cache atomically; a cache that cannot be written is skipped silently."""
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "ranges": ranges}, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _to_rows(entries: list[CommitEntry]) -> list[list[str]]:
+    return [[e.sha, e.date, e.subject, e.category] for e in entries]
+
+
+def _from_rows(rows: list) -> list[CommitEntry]:
+    return [CommitEntry(sha[:7], date, subject, category, sha) for sha, date, subject, category in rows]
+
+
+def cached_entries(
+    repo: Repo,
+    since_tag: str | None = None,
+    categorizer: Categorizer | None = None,
+) -> list[CommitEntry]:
+    """Changelog entries for HEAD (or since_tag..HEAD), newest first, reusing the cache.
+
+    If the cached head is still an ancestor of HEAD (and since_tag still points at
+    the same commit), only the commits after it are read from git log and put in
+    front of the cached entries. That is the order a full walk gives only when the
+    new commits form a single line, so if they include a merge, or after a rebase,
+    reset or moved tag, or a change in the categorizer's rules, the range is read
+    again in full. Raises GitError like iter_log.
+    """
+    categorizer = categorizer or DEFAULT_CATEGORIZER
+    path = cache_path(repo)
+    ranges = _load(path)
+    key = since_tag or ""
+    head = resolve_commit(repo, "HEAD")
+    base = resolve_tag(repo, since_tag) if since_tag is not None else ""
+
+    cached = ranges.get(key)
+    entries: list[CommitEntry] = []
+    exclude: list[str] = []
+    try:
+        if cached and cached["base"] == base and cached.get("rules") == categorizer.signature:
+            if cached["head"] == head:
+                return _from_rows(cached["entries"])
+            if is_ancestor(repo, cached["head"], head):
+                entries = _from_rows(cached["entries"])
+                exclude = [cached["head"]]
+    except (KeyError, TypeError, ValueError):
+        entries, exclude = [], []
+
+    records = iter_log(repo, since_tag=since_tag, exclude=exclude)
+    if exclude:
+        # Merged-in commits interleave with the cached ones by date in a full walk.
+        records = list(records)
+        if any(len(record.parents) > 1 for record in records):
+            entries = []
+            records = iter_log(repo, since_tag=since_tag)
+    entries = list(records_to_entries(records, categorizer)) + entries
+    ranges[key] = {"head": head, "base": base, "rules": categorizer.signature, "entries": _to_rows(entries)}
+    _save(path, ranges)
+    return entries
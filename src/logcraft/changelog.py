@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 import re
 from dataclasses import dataclass
-from typing import Iterator
+from typing import Iterable, Iterator
 
 # Conventional commit prefix -> section title (case-insensitive)
 PREFIX_TO_CATEGORY = {
@@ -13,7 +16,16 @@ PREFIX_TO_CATEGORY = {
     "chore": "Maintenance",
 }
 
-CATEGORY_ORDER = ["Features", "Bug Fixes", "Maintenance", "Other"]
+# Category for commits marked as breaking ("feat!: ...", "fix(api)!: ...").
+BREAKING = "Breaking Changes"
+
+CATEGORY_ORDER = [BREAKING, "Features", "Bug Fixes", "Maintenance", "Other"]
+
+# Per-repository categorizer settings, read from the working tree root.
+CONFIG_NAME = ".logcraft.json"
+
+# Section title for commits not contained in any tag.
+UNRELEASED = "Unreleased"
 
 
 @dataclass
@@ -24,31 +36,99 @@ class CommitEntry:
     date: str  # YYYY-MM-DD
     subject: str
     category: str
+    sha: str = ""  # full hash, when known
+
+
+@dataclass
+class Release:
+    """Commits first shipped in one tag (or not yet released)."""
+
+    name: str
+    date: str  # date of the tagged commit; "" for unreleased
+    entries: list[CommitEntry]
+
+
+class Categorizer:
+    """Classifies conventional-commit subjects and strips their prefix in one regex match.
+
+    types maps commit types to categories (case-insensitive), scopes maps scopes to a
+    category that overrides the type's ("chore(deps): ..." -> "Dependencies"). Subjects
+    marked breaking with "!" go to BREAKING. Categories not in CATEGORY_ORDER are
+    listed before "Other", in the order they first appear in types and scopes.
+    """
+
+    def __init__(
+        self,
+        types: dict[str, str] | None = None,
+        scopes: dict[str, str] | None = None,
+    ) -> None:
+        self.types = {k.lower(): v for k, v in (PREFIX_TO_CATEGORY if types is None else types).items()}
+        self.scopes = {k.lower(): v for k, v in (scopes or {}).items()}
+        extra = [c for c in [*self.types.values(), *self.scopes.values()] if c not in CATEGORY_ORDER]
+        self.order = CATEGORY_ORDER[:-1] + list(dict.fromkeys(extra)) + CATEGORY_ORDER[-1:]
+        # Longest types first, so "fixup" is not read as "fix" followed by "up".
+        alternatives = "|".join(re.escape(t) for t in sorted(self.types, key=len, reverse=True))
+        self._pattern = re.compile(
+            rf"(?P<type>{alternatives})(?P<scope>\((?P<name>[^)]*)\))?(?P<bang>!)?(?P<colon>:)?\s*",
+            re.IGNORECASE,
+        ) if self.types else None
+        signature = json.dumps([sorted(self.types.items()), sorted(self.scopes.items())])
+        self.signature = hashlib.sha256(signature.encode("utf-8")).hexdigest()[:16]
+
+    def classify(self, subject: str) -> tuple[str, str]:
+        """Return (category, display subject) for a commit subject (first line)."""
+        subject = subject.strip()
+        match = self._pattern.match(subject) if self._pattern else None
+        if match is None:
+            return "Other", subject
+        category = self.types[match.group("type").lower()]
+        if not match.group("colon"):
+            # "feat(" without a closing "):" still counts, but nothing is stripped.
+            if subject[match.end("type") : match.end("type") + 1] == "(":
+                return category, subject
+            return "Other", subject
+        if match.group("bang"):
+            category = BREAKING
+        elif match.group("scope"):
+            category = self.scopes.get(match.group("name").strip().lower(), category)
+        return category, subject[match.end() :].strip() or subject
+
+
+DEFAULT_CATEGORIZER = Categorizer()
+
+
+def load_categorizer(root: str) -> Categorizer:
+    """Categorizer configured by root/.logcraft.json, or the default one if there is none.
+
+    The file holds {"types": {"perf": "Performance"}, "scopes": {"deps": "Dependencies"}};
+    types are added to the built-in feat/fix/chore. Raises ValueError if it is malformed.
+    """
+    path = os.path.join(root, CONFIG_NAME)
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return DEFAULT_CATEGORIZER
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Could not read {path}: {e}") from e
+    sections = [data.get(key, {}) if isinstance(data, dict) else None for key in ("types", "scopes")]
+    for section in sections:
+        if not isinstance(section, dict) or not all(
+            isinstance(k, str) and isinstance(v, str) for k, v in section.items()
+        ):
+            raise ValueError(f"{path} must map \"types\" and \"scopes\" to objects of strings.")
+    types, scopes = sections
+    return Categorizer({**PREFIX_TO_CATEGORY, **types}, scopes)
 
 
 def _categorize(subject: str) -> str:
     """Return category for the commit subject (first line)."""
-    subject_lower = subject.strip().lower()
-    for prefix, category in PREFIX_TO_CATEGORY.items():
-        if subject_lower.startswith(prefix + ":") or subject_lower.startswith(prefix + "("):
-            return category
-    return "Other"
+    return DEFAULT_CATEGORIZER.classify(subject)[0]
 
 
 def _subject_display(subject: str, category: str) -> str:
     """Return subject line for display; optionally strip conventional prefix."""
-    subject = subject.strip()
-    subject_lower = subject.lower()
-    for prefix in PREFIX_TO_CATEGORY:
-        if subject_lower.startswith(prefix + ":"):
-            rest = subject[len(prefix) + 1 :].lstrip()
-            return rest or subject
-        if subject_lower.startswith(prefix + "("):
-            # feat(scope): message -> message
-            match = re.match(r"^\w+\([^)]*\):\s*", subject, re.IGNORECASE)
-            if match:
-                return subject[match.end() :].strip() or subject
-    return subject
+    return DEFAULT_CATEGORIZER.classify(subject)[1]
 
 
 def commits_to_entries(commits: Iterator) -> list[CommitEntry]:
@@ -57,8 +137,7 @@ def commits_to_entries(commits: Iterator) -> list[CommitEntry]:
     for commit in commits:
         message = commit.message or ""
         first_line = message.split("\n")[0] if message else "(no message)"
-        category = _categorize(first_line)
-        subject = _subject_display(first_line, category)
+        category, subject = DEFAULT_CATEGORIZER.classify(first_line)
         date = commit.committed_datetime.strftime("%Y-%m-%d") if commit.committed_datetime else ""
         short_hash = commit.hexsha[:7] if commit.hexsha else ""
         entries.append(
@@ -72,19 +151,105 @@ def commits_to_entries(commits: Iterator) -> list[CommitEntry]:
     return entries
 
 
-def render_markdown(entries: list[CommitEntry]) -> str:
-    """Render changelog entries as a single Markdown string."""
-    by_category = {}
-    for e in entries:
-        by_category.setdefault(e.category, []).append(e)
+def _record_entry(record, categorizer: Categorizer) -> CommitEntry:
+    """CommitEntry for one git_utils.LogRecord."""
+    message = record.message
+    first_line = message.split("\n", 1)[0] if message else "(no message)"
+    category, subject = categorizer.classify(first_line)
+    return CommitEntry(
+        short_hash=record.sha[:7],
+        date=record.date,
+        subject=subject,
+        category=category,
+        sha=record.sha,
+    )
 
-    lines = ["# Changelog", ""]
-    for cat in CATEGORY_ORDER:
+
+def records_to_entries(records: Iterable, categorizer: Categorizer | None = None) -> Iterator[CommitEntry]:
+    """Convert git_utils.LogRecord tuples to CommitEntry objects, lazily."""
+    categorizer = categorizer or DEFAULT_CATEGORIZER
+    for record in records:
+        yield _record_entry(record, categorizer)
+
+
+def _entry_line(e: CommitEntry) -> str:
+    return f"- {e.subject} (`{e.short_hash}`, {e.date})"
+
+
+def _category_lines(by_category: dict[str, list[str]], heading: str, order: list[str] | None) -> list[str]:
+    """Category sections in order (default CATEGORY_ORDER), each a heading followed by its entry lines."""
+    lines = []
+    for cat in order or CATEGORY_ORDER:
         if cat not in by_category:
             continue
-        lines.append(f"## {cat}")
+        lines.append(f"{heading} {cat}")
+        lines.append("")
+        lines.extend(by_category[cat])
         lines.append("")
-        for e in by_category[cat]:
-            lines.append(f"- {e.subject} (`{e.short_hash}`, {e.date})")
+    return lines
+
+
+def render_markdown(entries: Iterable[CommitEntry], order: list[str] | None = None) -> str:
+    """Render changelog entries as a single Markdown string.
+
+    entries may be a generator; only the rendered lines are kept per category.
+    order lists the category sections (default CATEGORY_ORDER; see Categorizer.order).
+    """
+    by_category: dict[str, list[str]] = {}
+    for e in entries:
+        by_category.setdefault(e.category, []).append(_entry_line(e))
+
+    lines = ["# Changelog", ""] + _category_lines(by_category, "##", order)
+    return "\n".join(lines).rstrip() + "\n"
+
+
+def group_by_release(
+    records: Iterable,
+    tags: dict[str, list[str]],
+    categorizer: Categorizer | None = None,
+) -> list[Release]:
+    """Assign each commit to the oldest release that contains it, in one pass.
+
+    records are git_utils.LogRecord tuples in topological order (children before
+    parents), tags maps commit SHA -> tag names. A tagged commit belongs to its own
+    tag; any other commit inherits the oldest release among its children, i.e. the
+    first tag whose history includes it. Commits in no tag are "Unreleased".
+    Returns releases newest first, with entries in walk order.
+    """
+    categorizer = categorizer or DEFAULT_CATEGORIZER
+    releases: list[Release] = []
+    # Release index handed down from already-seen children to parents not yet reached.
+    # Later indexes are older tags, since the walk runs from newest to oldest.
+    inherited: dict[str, int] = {}
+    unreleased: list[CommitEntry] = []
+    for record in records:
+        entry = _record_entry(record, categorizer)
+        names = tags.get(record.sha)
+        if names:
+            releases.append(Release(", ".join(sorted(names)), record.date, []))
+            index = len(releases) - 1
+            inherited.pop(record.sha, None)
+        else:
+            index = inherited.pop(record.sha, -1)
+        (releases[index].entries if index >= 0 else unreleased).append(entry)
+        for parent in record.parents:
+            if index > inherited.get(parent, -1):
+                inherited[parent] = index
+    if unreleased:
+        releases.insert(0, Release(UNRELEASED, "", unreleased))
+    return releases
+
+
+def render_releases(releases: Iterable[Release], order: list[str] | None = None) -> str:
+    """Render one "## <tag> (<date>)" section per release, with category subsections."""
+    lines = ["# Changelog", ""]
+    for release in releases:
+        if not release.entries:
+            continue
+        lines.append(f"## {release.name} ({release.date})" if release.date else f"## {release.name}")
         lines.append("")
+        by_category: dict[str, list[str]] = {}
+        for e in release.entries:
+            by_category.setdefault(e.category, []).append(_entry_line(e))
+        lines.extend(_category_lines(by_category, "###", order))
     return "\n".join(lines).rstrip() + "\n"
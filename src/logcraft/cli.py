@@ -2,11 +2,21 @@
 
 from __future__ import annotations
 
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import click
 
 from logcraft import __version__
-from logcraft.changelog import commits_to_entries, render_markdown
-from logcraft.git_utils import GitError, get_repo, iter_commits
+from logcraft.cache import cached_entries
+from logcraft.changelog import (
+    group_by_release,
+    load_categorizer,
+    records_to_entries,
+    render_markdown,
+    render_releases,
+)
+from logcraft.git_utils import GitError, get_repo, iter_log, tag_map
 
 
 def main() -> None:
@@ -14,6 +24,32 @@ def main() -> None:
     cli()
 
 
+def build_changelog(
+    path: str,
+    since: str | None = None,
+    releases: bool = False,
+    use_cache: bool = True,
+) -> tuple[str, str]:
+    """Return (working tree root, Markdown changelog) for the repository at path.
+
+    Categories come from .logcraft.json in the working tree, if present. Raises GitError,
+    or ValueError for a malformed config. Module-level so it can run in a worker process.
+    """
+    repo = get_repo(path)
+    root = repo.working_tree_dir or path
+    categorizer = load_categorizer(root)
+    if releases:
+        records = iter_log(repo, since_tag=since, topo_order=True)
+        markdown = render_releases(group_by_release(records, tag_map(repo), categorizer), categorizer.order)
+    elif use_cache:
+        markdown = render_markdown(cached_entries(repo, since_tag=since, categorizer=categorizer), categorizer.order)
+    else:
+        # Commits are streamed from git log straight into the renderer.
+        records = iter_log(repo, since_tag=since)
+        markdown = render_markdown(records_to_entries(records, categorizer), categorizer.order)
+    return root, markdown
+
+
 @click.command()
 @click.option(
     "--since",
@@ -34,6 +70,30 @@ def main() -> None:
     is_flag=True,
     help="Print changelog to terminal instead of writing a file.",
 )
+@click.option(
+    "--releases",
+    is_flag=True,
+    help="One section per tag, each listing the commits first released in it.",
+)
+@click.option(
+    "--repo",
+    "repo_paths",
+    multiple=True,
+    metavar="PATH",
+    help="Repository to process (repeatable). Each changelog is written inside its repository.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Worker processes when several --repo are given (default: 1).",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Read the whole history instead of reusing .git/logcraft-cache.",
+)
 @click.option(
     "--version",
     "show_version",
@@ -44,32 +104,62 @@ def cli(
     since: str | None,
     output_path: str,
     dry_run: bool,
+    releases: bool,
+    repo_paths: tuple[str, ...],
+    jobs: int,
+    no_cache: bool,
     show_version: bool,
 ) -> None:
     """Craft CHANGELOG.md from git commit history.
 
     Run from a git repository root. Commits are categorized by conventional
-    prefixes: feat: -> Features, fix: -> Bug Fixes, chore: -> Maintenance.
+    prefixes: feat: -> Features, fix: -> Bug Fixes, chore: -> Maintenance, and
+    "!" (feat!: ...) -> Breaking Changes. More types and per-scope categories
+    can be set in .logcraft.json.
     """
     if show_version:
         click.echo(f"Logcraft {__version__}")
         return
 
-    try:
-        repo = get_repo(".")
-    except GitError as e:
-        click.echo(str(e), err=True)
-        raise SystemExit(1) from e
+    if not repo_paths:
+        try:
+            _, markdown = build_changelog(".", since, releases, not no_cache)
+        except (GitError, ValueError) as e:
+            click.echo(str(e), err=True)
+            raise SystemExit(1) from e
+        _emit(markdown, output_path, dry_run)
+        return
+
+    args = [(path, since, releases, not no_cache) for path in repo_paths]
+    failed = False
+    if jobs > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(build_changelog, *a) for a in args]
+            results = [_result(future.result, path) for future, path in zip(futures, repo_paths)]
+    else:
+        results = [_result(lambda a=a: build_changelog(*a), a[0]) for a in args]
+    for result in results:
+        if result is None:
+            failed = True
+            continue
+        root, markdown = result
+        if dry_run:
+            click.echo(f"==> {root} <==")
+        _emit(markdown, os.path.join(root, output_path), dry_run)
+    if failed:
+        raise SystemExit(1)
+
 
+def _result(get, path: str) -> tuple[str, str] | None:
+    """get() or, if it raises GitError or ValueError, None after printing the error for path."""
     try:
-        commits = list(iter_commits(repo, since_tag=since))
-    except GitError as e:
-        click.echo(str(e), err=True)
-        raise SystemExit(1) from e
+        return get()
+    except (GitError, ValueError) as e:
+        click.echo(f"{path}: {e}", err=True)
+        return None
 
-    entries = commits_to_entries(commits)
-    markdown = render_markdown(entries)
 
+def _emit(markdown: str, output_path: str, dry_run: bool) -> None:
     if dry_run:
         click.echo(markdown)
     else:
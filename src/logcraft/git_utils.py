@@ -2,9 +2,18 @@
 
 from __future__ import annotations
 
+from typing import Iterable, Iterator, NamedTuple
+
 from git import Repo
 from git.exc import InvalidGitRepositoryError, GitCommandError
 
+# One record per commit: hash, parent hashes, committer date, raw message, separated by
+# US (0x1f). Records are NUL-terminated (-z), so messages may contain any other character.
+LOG_FORMAT = "%H%x1f%P%x1f%cd%x1f%B"
+
+# Bytes read from the git log pipe at a time.
+READ_SIZE = 1 << 16
+
 
 class GitError(Exception):
     """Raised when a git operation fails."""
@@ -41,3 +50,108 @@ def iter_commits(repo: Repo, since_tag: str | None = None):
         yield from repo.iter_commits(rev)
     except (GitCommandError, ValueError) as e:
         raise GitError(f"Invalid or missing tag '{since_tag}': {e}") from e
+
+
+class LogRecord(NamedTuple):
+    """One commit as read from `git log`."""
+
+    sha: str
+    date: str  # YYYY-MM-DD
+    message: str
+    parents: tuple[str, ...] = ()
+
+
+def resolve_commit(repo: Repo, rev: str) -> str:
+    """Full SHA of the commit rev points to (tags are peeled).
+
+    Raises GitError if rev does not name a commit.
+    """
+    try:
+        return repo.git.rev_parse("--verify", "--quiet", f"{rev}^{{commit}}").strip()
+    except GitCommandError as e:
+        raise GitError(f"Unknown revision '{rev}': {e}") from e
+
+
+def is_ancestor(repo: Repo, ancestor: str, commit: str) -> bool:
+    """True if ancestor is reachable from commit (False also when ancestor no longer exists)."""
+    try:
+        repo.git.merge_base("--is-ancestor", ancestor, commit)
+    except GitCommandError:
+        return False
+    return True
+
+
+def resolve_tag(repo: Repo, tag: str) -> str:
+    """Full SHA of the commit tag points to. Raises GitError if the tag does not exist."""
+    try:
+        return resolve_commit(repo, tag)
+    except GitError as e:
+        raise GitError(f"Invalid or missing tag '{tag}': {e.__cause__}") from e
+
+
+def _rev_range(repo: Repo, since_tag: str | None) -> list[str]:
+    """Revision arguments for git log; checks that since_tag names a commit."""
+    if since_tag is None:
+        return ["HEAD"]
+    resolve_tag(repo, since_tag)
+    # Rev spec "tag..HEAD" = commits reachable from HEAD but not from tag
+    return [f"{since_tag}..HEAD"]
+
+
+def iter_log(
+    repo: Repo,
+    since_tag: str | None = None,
+    exclude: Iterable[str] = (),
+    topo_order: bool = False,
+) -> Iterator[LogRecord]:
+    """Yield a LogRecord per commit, newest first, like iter_commits.
+
+    Reads a single `git log -z` pipe, so no commit objects are loaded and memory
+    stays flat however long the history is. Commits reachable from any revision in
+    exclude are left out. With topo_order, every commit comes before its parents.
+    Raises GitError if since_tag does not exist or git fails.
+    """
+    args = _rev_range(repo, since_tag) + [f"^{rev}" for rev in exclude]
+    if topo_order:
+        args.insert(0, "--topo-order")
+    proc = repo.git.log("-z", f"--format={LOG_FORMAT}", "--date=short", *args, "--", as_process=True)
+    pending = b""
+    try:
+        while True:
+            chunk = proc.stdout.read(READ_SIZE)
+            if not chunk:
+                break
+            records = (pending + chunk).split(b"\0")
+            pending = records.pop()
+            for raw in records:
+                yield _parse_record(raw)
+        if pending:
+            yield _parse_record(pending)
+        proc.wait()
+    except GitCommandError as e:
+        raise GitError(f"git log failed: {e}") from e
+    finally:
+        proc.stdout.close()
+
+
+def _parse_record(raw: bytes) -> LogRecord:
+    sha, parents, date, message = raw.decode("utf-8", errors="replace").split("\x1f", 3)
+    return LogRecord(sha.lstrip("\n"), date, message, tuple(parents.split()))
+
+
+def tag_map(repo: Repo) -> dict[str, list[str]]:
+    """Commit SHA -> names of the tags pointing at it (annotated tags are peeled), from one git call."""
+    try:
+        output = repo.git.for_each_ref(
+            "--format=%(objectname) %(*objectname) %(refname:short)", "refs/tags"
+        )
+    except GitCommandError as e:
+        raise GitError(f"Could not list tags: {e}") from e
+    tags: dict[str, list[str]] = {}
+    for line in output.splitlines():
+        parts = line.split(" ")
+        if len(parts) != 3:
+            continue
+        sha, peeled, name = parts
+        tags.setdefault(peeled or sha, []).append(name)
+    return tags